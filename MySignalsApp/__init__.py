@@ -1,7 +1,11 @@
 from flask_limiter.util import get_remote_address
 from MySignalsApp.config import App_Config
-from binance.spot import Spot
-from binance.um_futures import UMFutures
+from MySignalsApp.binance_clients import BinanceClientPool
+from MySignalsApp.credentials import ApiCredentialCache
+from MySignalsApp.telegram_dispatcher import TelegramDispatcher
+from MySignalsApp.mail_queue import MailQueue
+from MySignalsApp.event_broker import EventBroker
+from MySignalsApp.password_hasher import PasswordHasher
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_session import Session
@@ -13,6 +17,7 @@ from flask_bcrypt import Bcrypt
 from flask_mail import Mail
 from flask_cors import CORS
 from dotenv import load_dotenv
+import redis
 import json
 import logging
 from logging.handlers import RotatingFileHandler
@@ -22,14 +27,26 @@ load_dotenv(".env")
 
 db = SQLAlchemy()
 
+event_broker = EventBroker(db)
+
 bcrypt = Bcrypt()
 
+passwords = PasswordHasher(bcrypt)
+
 sess = Session()
 
 mail = Mail()
 
+mail_queue = MailQueue(mail)
+
 cache = Cache()
 
+binance_clients = BinanceClientPool()
+
+api_credentials = ApiCredentialCache()
+
+tg_dispatcher = TelegramDispatcher()
+
 admin = Admin(name="MySignalsApp", template_mode="bootstrap3")
 
 limiter = Limiter(
@@ -61,13 +78,33 @@ def create_app(config_class=App_Config):
     db.init_app(app)
     # Initialize Flask-Mail
     mail.init_app(app)
+    # Initialize mail delivery queue
+    mail_queue.init_app(app)
     # Initialize Bcrypt
     bcrypt.init_app(app)
-    # Initialize Flask-Session
-    sess.init_app(app)
+    # Initialize bounded password hashing pool
+    passwords.init_app(app)
+    # Initialize Flask-Session, the cookie backend is Flask's own signed cookie
+    if app.config["SESSION_TYPE"] == "redis" and "SESSION_REDIS" not in app.config:
+        if not os.environ.get("REDIS"):
+            raise RuntimeError(
+                "SESSION_TYPE is redis but REDIS is not set, set REDIS to the "
+                "server's url or choose the sqlalchemy or cookie session type"
+            )
+        app.config["SESSION_REDIS"] = redis.from_url(os.environ["REDIS"])
+    if app.config["SESSION_TYPE"] != "cookie":
+        sess.init_app(app)
     migrate = Migrate(app, db)
     # Initialize cache
     cache.init_app(app)
+    # Initialize Binance client pool
+    binance_clients.init_app(app)
+    # Initialize decrypted api credential cache
+    api_credentials.init_app(app)
+    # Initialize Telegram notification dispatcher
+    tg_dispatcher.init_app(app)
+    # Initialize event stream pub/sub
+    event_broker.init_app(app)
     # Initialize Admin
     admin.init_app(app)
 
@@ -88,6 +125,11 @@ def create_app(config_class=App_Config):
 
     admin.add_views(*model_views)
 
+    from MySignalsApp.commands import cli_commands
+
+    for command in cli_commands:
+        app.cli.add_command(command)
+
     # Initialize rate limiter
     limiter.init_app(app)
     limiter.limit("25/second", override_defaults=True)(admin.index_view.blueprint)
@@ -97,7 +139,14 @@ def create_app(config_class=App_Config):
     # with app.app_context():
     #     db.create_all()
 
-    set_precision(get_exchange_info())
+    from MySignalsApp.exchange_info import (
+        load_precision_snapshot,
+        start_precision_refresher,
+    )
+
+    with app.app_context():
+        load_precision_snapshot(app)
+    start_precision_refresher(app)
 
     return app
 
@@ -108,49 +157,4 @@ def get_contract_details():
     return data["address"], data["abi"]
 
 
-def set_precision(exchange_info):
-    (spot_, futures_) = exchange_info
-    for f_info in futures_:
-        cache.set(f'futures_prec_{f_info["symbol"]}', f_info["minQty"])
-    for s_info in spot_:
-        cache.set(f'spot_prec_{s_info["symbol"]}', s_info["minQty"])
-
-
-@cache.memoize(timeout=2629746)  # 1 month
-def get_exchange_info():
-    spot_client = Spot()
-    futures_client = UMFutures()
-
-    spt_info = spot_client.exchange_info(permissions=["SPOT"])["symbols"]
-    futr_info = futures_client.exchange_info()["symbols"]
-
-    spot_ = [
-        {
-            "symbol": symbol["symbol"],
-            "minQty": [
-                filter_class["minQty"]
-                for filter_class in symbol["filters"]
-                if filter_class["filterType"] == "LOT_SIZE"
-            ][0],
-        }
-        for symbol in spt_info
-        if symbol["quoteAsset"] == "USDT"
-    ]
-
-    futures_ = [
-        {
-            "symbol": symbol["symbol"],
-            "minQty": [
-                filter_class["minQty"]
-                for filter_class in symbol["filters"]
-                if filter_class["filterType"] == "LOT_SIZE"
-            ][0],
-        }
-        for symbol in futr_info
-        if symbol["quoteAsset"] == "USDT"
-    ]
-
-    return (spot_, futures_)
-
-
 contract_address, abi = get_contract_details()
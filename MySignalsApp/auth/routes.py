@@ -1,10 +1,11 @@
 from flask import jsonify, request, Blueprint, session, render_template, current_app
-from cryptography.fernet import Fernet
 from MySignalsApp.models.users import User
 from MySignalsApp.models.notifications import Notification
-from datetime import datetime
 from pydantic import ValidationError
-from MySignalsApp import bcrypt
+from MySignalsApp import db, passwords, binance_clients, api_credentials
+from MySignalsApp.errors.handlers import UtilError
+from sqlalchemy import or_
+from MySignalsApp.credentials import encrypt_credential
 from MySignalsApp.schemas import (
     RegisterSchema,
     StringUUIDQuerySchema,
@@ -16,9 +17,11 @@ from MySignalsApp.schemas import (
 )
 from MySignalsApp.utils import (
     query_one_filtered,
-    query_paginate_filtered,
+    query_listing_filtered,
+    pagination_meta,
     verify_reset_token,
     send_email,
+    load_current_user,
 )
 import os
 
@@ -26,11 +29,6 @@ import os
 auth = Blueprint("auth", __name__, url_prefix="/auth")
 
 
-KEY = os.getenv("FERNET_KEY")
-
-kryptr = Fernet(KEY.encode("utf-8"))
-
-
 @auth.route("/register", methods=["POST"])
 def register_user():
     data = request.get_json()
@@ -54,7 +52,7 @@ def register_user():
         user = User(
             user_name=data.user_name,
             email=data.email,
-            password=bcrypt.generate_password_hash(data.password).decode("utf-8"),
+            password=passwords.generate(data.password),
             referrers_code=data.referral_code
             if query_one_filtered(User, referral_code=data.referral_code)
             else None,
@@ -86,6 +84,11 @@ def register_user():
             jsonify({"error": "Bad Request", "message": msg, "status": False}),
             400,
         )
+    except UtilError as e:
+        return (
+            jsonify({"error": e.error, "message": e.message, "status": False}),
+            e.code,
+        )
     except Exception as e:
         current_app.log_exception(exc_info=e)
         return (
@@ -144,41 +147,37 @@ def login_user():
     data = request.get_json()
     data = LoginSchema(**data)
     try:
-        user = query_one_filtered(User, user_name=data.user_name_or_mail)
-        if not user or not bcrypt.check_password_hash(user.password, data.password):
-            user = query_one_filtered(User, email=data.user_name_or_mail)
-            if not user or not bcrypt.check_password_hash(user.password, data.password):
-                return (
-                    jsonify(
-                        {
-                            "error": "Unauthorized",
-                            "message": "Incorrect username or password",
-                            "status": False,
-                        },
-                    ),
-                    401,
+        # a user_name that happens to equal another user's email wins, and only
+        # that account's password is checked, the email account isn't tried after
+        user = db.session.execute(
+            db.select(User)
+            .filter(
+                or_(
+                    User.user_name == data.user_name_or_mail,
+                    User.email == data.user_name_or_mail,
                 )
-
-            session["user"] = {"id": user.id, "permission": user.roles.value}
-            roles = user.roles.value
+            )
+            .order_by((User.user_name == data.user_name_or_mail).desc())
+            .limit(1)
+        ).scalar_one_or_none()
+        if not passwords.check(user.password if user else None, data.password):
             return (
                 jsonify(
                     {
-                        "message": "Success",
-                        "id": user.id,
-                        "user_name": user.user_name,
-                        "is_active": user.is_active,
-                        "has_api_keys": bool(user.api_key and user.api_secret),
-                        "permission": [roles]
-                        if not isinstance(roles, tuple)
-                        else roles,
-                        "referral_code": user.referral_code,
-                        "status": True,
-                    }
+                        "error": "Unauthorized",
+                        "message": "Incorrect username or password",
+                        "status": False,
+                    },
                 ),
-                200,
+                401,
             )
+
+        if pw_hash := passwords.rehash(user.password, data.password):
+            user.password = pw_hash
+            user.update()
+
         session["user"] = {"id": user.id, "permission": user.roles.value}
+        session.permanent = True
         roles = user.roles.value
         return (
             jsonify(
@@ -195,7 +194,11 @@ def login_user():
             ),
             200,
         )
-
+    except UtilError as e:
+        return (
+            jsonify({"error": e.error, "message": e.message, "status": False}),
+            e.code,
+        )
     except Exception as e:
         current_app.log_exception(exc_info=e)
         return (
@@ -257,9 +260,10 @@ def reset_password(token):
     data = ResetPasswordSchema(token=token, **data)
     try:
         if user := verify_reset_token(User, data.token):
-            user.password = bcrypt.generate_password_hash(data.password).decode("utf-8")
+            user.password = passwords.generate(data.password)
             user.update()
             session.pop("user", None)
+            api_credentials.evict(user.id)
             return jsonify({"message": "Password changed", "status": True}), 200
 
         return (
@@ -272,6 +276,11 @@ def reset_password(token):
             ),
             400,
         )
+    except UtilError as e:
+        return (
+            jsonify({"error": e.error, "message": e.message, "status": False}),
+            e.code,
+        )
     except Exception as e:
         current_app.log_exception(exc_info=e)
         return (
@@ -288,7 +297,8 @@ def reset_password(token):
 
 @auth.route("/logout", methods=["GET", "POST"])
 def logout_user():
-    session.pop("user", None)
+    if user := session.pop("user", None):
+        api_credentials.evict(user.get("id"))
     return (
         jsonify({"message": "Success", "status": True}),
         200,
@@ -311,7 +321,7 @@ def see_sess():
             401,
         )
     try:
-        user = query_one_filtered(User, id=user["id"])
+        user = load_current_user()
         roles = user.roles.value
         return jsonify(
             {
@@ -353,7 +363,7 @@ def update_keys():
     data = request.get_json()
     data = UpdateKeysSchema(**data)
     try:
-        user = query_one_filtered(User, id=user.get("id"))
+        user = load_current_user()
         if not user:
             return (
                 jsonify(
@@ -365,13 +375,13 @@ def update_keys():
                 ),
                 404,
             )
-        user.api_key = kryptr.encrypt(data.api_key.encode("utf-8")).decode("utf-8")
-        user.api_secret = kryptr.encrypt(data.api_secret.encode("utf-8")).decode(
-            "utf-8"
-        )
+        if user.api_key and user.api_secret:
+            binance_clients.invalidate(*api_credentials.get(user))
+            api_credentials.evict(user.id)
+        user.api_key = encrypt_credential(data.api_key)
+        user.api_secret = encrypt_credential(data.api_secret)
+        Notification.notify(user.id, "Your Api Credentials Was Successfully Updated")
         user.update()
-        notify = Notification(user.id, "Your Api Credentials Was Successfully Updated")
-        notify.insert()
         return jsonify(
             {
                 "message": "success",
@@ -410,8 +420,12 @@ def get_notifications():
             ),
             401,
         )
-    page = PageQuerySchema(page=request.args.get("page", 1))
-    user = query_one_filtered(User, id=user.get("id"))
+    page = PageQuerySchema(
+        page=request.args.get("page", 1),
+        cursor=request.args.get("cursor"),
+        with_total=request.args.get("with_total", False),
+    )
+    user = load_current_user()
     if not user:
         return (
             jsonify(
@@ -423,17 +437,15 @@ def get_notifications():
             ),
             404,
         )
-    user.last_notification_read_time = datetime.utcnow()
-    user.update()
+    user.mark_notifications_read()
 
-    notifications = query_paginate_filtered(Notification, page.page, user_id=user.id)
+    notifications = query_listing_filtered(Notification, page, user_id=user.id)
 
     return jsonify(
         {
             "message": "success",
             "status": True,
-            "pages": notifications.pages,
-            "total": notifications.total,
+            **pagination_meta(notifications),
             "notifications": [
                 notification.format() for notification in notifications.items
             ],
@@ -455,7 +467,7 @@ def get_unread_notifications_count():
             ),
             401,
         )
-    user = query_one_filtered(User, id=user.get("id"))
+    user = load_current_user()
     if not user:
         return (
             jsonify(
@@ -0,0 +1,84 @@
+from binance.spot import Spot
+from binance.um_futures import UMFutures
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+import hashlib
+
+
+def credential_hash(api_key, api_secret):
+    return hashlib.sha256(f"{api_key}:{api_secret}".encode("utf-8")).hexdigest()
+
+
+class BinanceClientPool:
+    """
+    Bounded LRU pool of Binance clients keyed by (market, base_url, credential hash).
+
+    Each client keeps its requests session, so trades of the same user reuse
+    keep-alive HTTPS connections instead of opening new ones per request.
+    Clients idle for longer than BINANCE_CLIENT_IDLE_TIMEOUT are closed.
+    """
+
+    def __init__(self, app=None):
+        self.max_size = 256
+        self.idle_timeout = 300
+        self.base_urls = {"spot": None, "futures": None}
+        self._clients = OrderedDict()
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_size = app.config["BINANCE_CLIENT_POOL_SIZE"]
+        self.idle_timeout = app.config["BINANCE_CLIENT_IDLE_TIMEOUT"]
+        self.base_urls = {
+            "spot": app.config["BINANCE_SPOT_BASE_URL"],
+            "futures": app.config["BINANCE_FUTURES_BASE_URL"],
+        }
+
+    def spot(self, api_key=None, api_secret=None, base_url=None):
+        return self._get("spot", Spot, api_key, api_secret, base_url)
+
+    def futures(self, api_key=None, api_secret=None, base_url=None):
+        return self._get("futures", UMFutures, api_key, api_secret, base_url)
+
+    def invalidate(self, api_key, api_secret):
+        """Close the clients built with these credentials, e.g. after they changed"""
+        digest = credential_hash(api_key, api_secret)
+        with self._lock:
+            stale = [key for key in self._clients if key[2] == digest]
+            clients = [self._clients.pop(key)[0] for key in stale]
+        self._close(clients)
+
+    def _get(self, market, client_class, api_key, api_secret, base_url):
+        base_url = base_url or self.base_urls[market]
+        key = (market, base_url, credential_hash(api_key, api_secret))
+        now = monotonic()
+        with self._lock:
+            expired = self._evict_idle(now)
+            if key in self._clients:
+                client = self._clients[key][0]
+            else:
+                kwargs = {"base_url": base_url} if base_url else {}
+                client = client_class(api_key, api_secret, **kwargs)
+            self._clients[key] = (client, now)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_size:
+                expired.append(self._clients.popitem(last=False)[1][0])
+        self._close(expired)
+        return client
+
+    def _evict_idle(self, now):
+        expired = []
+        while self._clients:
+            key, (client, last_used) = next(iter(self._clients.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            del self._clients[key]
+            expired.append(client)
+        return expired
+
+    @staticmethod
+    def _close(clients):
+        for client in clients:
+            client.session.close()
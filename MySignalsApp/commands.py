@@ -0,0 +1,294 @@
+from MySignalsApp.models.users import User
+from MySignalsApp.models.signals import Signal
+from MySignalsApp.models.placed_signals import PlacedSignals
+from MySignalsApp.models.provider_ratings import ProviderRating
+from MySignalsApp.models.notifications import Notification
+from MySignalsApp.models.provider_application import ProviderApplication
+from MySignalsApp.models.user_tokens import UserTokens
+from flask.cli import with_appcontext
+from flask import current_app
+from datetime import datetime, timezone
+from MySignalsApp import db, passwords
+import click
+
+
+@click.command("backfill-ratings")
+@click.option("--chunk-size", default=500, show_default=True, type=int)
+@with_appcontext
+def backfill_ratings(chunk_size):
+    """Recompute provider rating aggregates from placedsignals."""
+    last_id, providers, repaired = "", 0, 0
+    while True:
+        user_ids = (
+            db.session.execute(
+                db.select(User.id)
+                .filter(User.id > last_id)
+                .order_by(User.id)
+                .limit(chunk_size)
+            )
+            .scalars()
+            .all()
+        )
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+
+        # lock existing aggregates so ratings placed meanwhile wait for this chunk
+        existing = {
+            rating.provider_id: rating
+            for rating in db.session.execute(
+                db.select(ProviderRating)
+                .filter(ProviderRating.provider_id.in_(user_ids))
+                .with_for_update()
+            ).scalars()
+        }
+        aggregates = {
+            provider_id: aggregate
+            for provider_id, *aggregate in db.session.execute(
+                db.select(
+                    Signal.provider,
+                    db.func.coalesce(db.func.sum(PlacedSignals.rating), 0),
+                    db.func.count(PlacedSignals.id).filter(PlacedSignals.rating > 0),
+                    db.func.count(PlacedSignals.id).filter(PlacedSignals.rating == 0),
+                )
+                .join(PlacedSignals.signal)
+                .filter(Signal.provider.in_(user_ids))
+                .group_by(Signal.provider)
+            )
+        }
+
+        for provider_id in existing.keys() | aggregates.keys():
+            rating_sum, rated_count, unrated_count = aggregates.get(
+                provider_id, (0, 0, 0)
+            )
+            rating = existing.get(provider_id)
+            if not rating:
+                db.session.add(
+                    ProviderRating(provider_id, rating_sum, rated_count, unrated_count)
+                )
+            elif (rating.rating_sum, rating.rated_count, rating.unrated_count) == (
+                rating_sum,
+                rated_count,
+                unrated_count,
+            ):
+                continue
+            else:
+                rating.rating_sum = rating_sum
+                rating.rated_count = rated_count
+                rating.unrated_count = unrated_count
+            repaired += 1
+        providers += len(existing.keys() | aggregates.keys())
+        db.session.commit()
+
+    click.echo(f"checked {providers} provider aggregates, repaired {repaired}")
+
+
+@click.command("reconcile-unread")
+@click.option("--chunk-size", default=500, show_default=True, type=int)
+@with_appcontext
+def reconcile_unread(chunk_size):
+    """Recompute users' unread notification counters from notifications."""
+    last_id, checked, repaired = "", 0, 0
+    while True:
+        # lock the chunk so notifications committed meanwhile wait for it
+        users = (
+            db.session.execute(
+                db.select(User)
+                .filter(User.id > last_id)
+                .order_by(User.id)
+                .limit(chunk_size)
+                .with_for_update()
+            )
+            .scalars()
+            .all()
+        )
+        if not users:
+            break
+        last_id = users[-1].id
+
+        unread = dict(
+            db.session.execute(
+                db.select(Notification.user_id, db.func.count(Notification.id))
+                .join(User, User.id == Notification.user_id)
+                .filter(
+                    User.id.in_([user.id for user in users]),
+                    Notification.date_created
+                    > db.func.coalesce(
+                        User.last_notification_read_time, datetime(1900, 1, 1)
+                    ),
+                )
+                .group_by(Notification.user_id)
+            ).all()
+        )
+        for user in users:
+            if user.unread_notifications != unread.get(user.id, 0):
+                user.unread_notifications = unread.get(user.id, 0)
+                repaired += 1
+        checked += len(users)
+        db.session.commit()
+
+    click.echo(f"checked {checked} unread counters, repaired {repaired}")
+
+
+@click.command("sweep-sessions")
+@click.option("--chunk-size", default=1000, show_default=True, type=int)
+@with_appcontext
+def sweep_sessions(chunk_size):
+    """Delete expired sessions of the sqlalchemy session backend."""
+    if current_app.config["SESSION_TYPE"] != "sqlalchemy":
+        click.echo(f"{current_app.config['SESSION_TYPE']} sessions expire on their own")
+        return
+    Session = current_app.session_interface.sql_session_model
+    swept = 0
+    while True:
+        # short transactions so logins don't wait on a large delete
+        expired = db.select(Session.id).filter(Session.expiry <= datetime.utcnow())
+        deleted = db.session.execute(
+            db.delete(Session)
+            .where(Session.id.in_(expired.limit(chunk_size).scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        swept += deleted
+        if deleted < chunk_size:
+            break
+
+    click.echo(f"swept {swept} expired sessions")
+
+
+@click.command("sweep-tokens")
+@click.option("--chunk-size", default=1000, show_default=True, type=int)
+@with_appcontext
+def sweep_tokens(chunk_size):
+    """Delete expired tokens and the inactive accounts that never used theirs."""
+    now = datetime.now(timezone.utc)
+    referral = db.aliased(User)
+    # never activated and nothing refers to them but their expired tokens
+    abandoned = (
+        db.select(User.id)
+        .filter(
+            User.is_active.is_(False),
+            db.select(UserTokens.id)
+            .filter(UserTokens.user_id == User.id, UserTokens.expiration <= now)
+            .exists(),
+            ~db.select(UserTokens.id)
+            .filter(UserTokens.user_id == User.id, UserTokens.expiration > now)
+            .exists(),
+            ~db.select(referral.id)
+            .filter(referral.referrers_code == User.referral_code)
+            .exists(),
+            *(
+                ~db.select(column).filter(column == User.id).exists()
+                for column in (
+                    Notification.user_id,
+                    Signal.provider,
+                    PlacedSignals.user_id,
+                    ProviderApplication.user_id,
+                    ProviderRating.provider_id,
+                )
+            ),
+        )
+        .limit(chunk_size)
+    )
+    accounts = 0
+    while user_ids := db.session.execute(abandoned).scalars().all():
+        db.session.execute(
+            db.delete(UserTokens)
+            .where(UserTokens.user_id.in_(user_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            db.delete(User)
+            .where(User.id.in_(user_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        accounts += len(user_ids)
+
+    tokens = 0
+    while True:
+        expired = db.select(UserTokens.id).filter(UserTokens.expiration <= now)
+        deleted = db.session.execute(
+            db.delete(UserTokens)
+            .where(UserTokens.id.in_(expired.limit(chunk_size).scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        tokens += deleted
+        if deleted < chunk_size:
+            break
+
+    click.echo(f"swept {tokens} expired tokens and {accounts} abandoned accounts")
+
+
+@click.command("run-indexer")
+@click.option("--once", is_flag=True, help="Exit once caught up with the chain.")
+@with_appcontext
+def run_indexer(once):
+    """Index CompensateProvider events and record the purchases they pay for."""
+    from MySignalsApp.indexer import run_indexer, has_checkpoint
+
+    # scanning from the genesis block would take days of empty ranges
+    if current_app.config["INDEXER_START_BLOCK"] is None and not has_checkpoint():
+        raise click.UsageError(
+            "Set INDEXER_START_BLOCK to the block the signals contract was deployed in"
+        )
+    run_indexer(current_app._get_current_object(), once)
+
+
+@click.command("calibrate-bcrypt")
+@click.option("--min-rounds", default=10, show_default=True, type=int)
+@click.option("--max-rounds", default=15, show_default=True, type=int)
+@click.option("--samples", default=3, show_default=True, type=int)
+@click.option("--target-ms", type=int, help="Defaults to BCRYPT_TARGET_MS.")
+@with_appcontext
+def calibrate_bcrypt(min_rounds, max_rounds, samples, target_ms):
+    """Measure bcrypt hash time per cost on this host, to pin BCRYPT_LOG_ROUNDS."""
+    target_ms = target_ms or current_app.config["BCRYPT_TARGET_MS"]
+    best = None
+    for rounds in range(min_rounds, max_rounds + 1):
+        elapsed_ms = passwords.measure(rounds, samples) * 1000
+        click.echo(f"rounds {rounds}: {elapsed_ms:.0f}ms")
+        if target_ms and elapsed_ms <= target_ms:
+            best = rounds
+        elif target_ms:
+            break
+    click.echo(f"in use: {passwords.rounds}")
+    if target_ms:
+        click.echo(
+            f"BCRYPT_LOG_ROUNDS={best} fits {target_ms}ms"
+            if best
+            else f"no cost from {min_rounds} fits {target_ms}ms"
+        )
+
+
+@click.command("recover-orders")
+@click.option(
+    "--min-age",
+    default=300,
+    show_default=True,
+    type=int,
+    help="Seconds since a trade's last attempt before it is retried.",
+)
+@click.option("--max-attempts", default=5, show_default=True, type=int)
+@with_appcontext
+def recover_orders(min_age, max_attempts):
+    """Retry stop/take profit orders left pending by a crash or an error."""
+    from MySignalsApp.order_pipeline import recover_pending_orders
+
+    recovered, given_up, retrying = recover_pending_orders(min_age, max_attempts)
+    click.echo(
+        f"settled {recovered} pending trades, gave up on {given_up}, "
+        f"{retrying} left to retry"
+    )
+
+
+cli_commands = [
+    backfill_ratings,
+    reconcile_unread,
+    sweep_sessions,
+    sweep_tokens,
+    run_indexer,
+    calibrate_bcrypt,
+    recover_orders,
+]
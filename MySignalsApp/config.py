@@ -7,7 +7,10 @@ load_dotenv(".env")
 
 
 class App_Config:
-    SESSION_TYPE = "sqlalchemy"
+    # "redis", "cookie" (signed, stateless) or "sqlalchemy"
+    SESSION_TYPE = os.environ.get(
+        "SESSION_TYPE", "redis" if os.environ.get("REDIS") else "sqlalchemy"
+    )
     SESSION_USE_SIGNER = True
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
@@ -26,6 +29,23 @@ class App_Config:
     MAIL_USE_SSL = False
     MAIL_USERNAME = os.environ.get("USER_NAME")
     MAIL_PASSWORD = os.environ.get("PASS")
+    MAIL_QUEUE_WORKERS = 2
+    MAIL_QUEUE_SIZE = 1000
+    MAIL_BATCH_SIZE = 20
+    MAIL_MAX_RETRIES = 3
+    MAIL_RETRY_DELAY = 1  # seconds, doubled on every retry
+    MAIL_CONNECTION_IDLE_TIMEOUT = 30
+
+    BCRYPT_LOG_ROUNDS = int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))
+    # the hash time flask calibrate-bcrypt suggests BCRYPT_LOG_ROUNDS for
+    BCRYPT_TARGET_MS = (
+        int(os.environ["BCRYPT_TARGET_MS"])
+        if os.environ.get("BCRYPT_TARGET_MS")
+        else None
+    )
+    BCRYPT_WORKERS = 2  # concurrent hashes per process
+    BCRYPT_QUEUE_SIZE = 16
+    BCRYPT_QUEUE_TIMEOUT = 5
 
     CACHE_TYPE = "RedisCache" if os.environ.get("REDIS") else "FileSystemCache"
     CACHE_REDIS_HOST = os.environ.get("REDISHOST")
@@ -33,6 +53,58 @@ class App_Config:
     CACHE_DEFAULT_TIMEOUT = 0
     CACHE_DIR = "cache"
 
+    SPOT_EXCHANGE_INFO_SNAPSHOT = os.environ.get(
+        "SPOT_EXCHANGE_INFO_SNAPSHOT", "snapshots/spot_exchange_info.json"
+    )
+    FUTURES_EXCHANGE_INFO_SNAPSHOT = os.environ.get(
+        "FUTURES_EXCHANGE_INFO_SNAPSHOT", "snapshots/futures_exchange_info.json"
+    )
+    EXCHANGE_INFO_REFRESH_INTERVAL = 21600  # 6 hours, 0 disables the refresher
+    EXCHANGE_INFO_MIN_RELOAD_INTERVAL = 60
+
+    CREDENTIAL_CACHE_TTL = 60
+    CREDENTIAL_CACHE_SIZE = 1024
+
+    BINANCE_CLIENT_POOL_SIZE = 256
+    BINANCE_CLIENT_IDLE_TIMEOUT = 300
+    # the connector's production endpoints when unset, e.g. set to the testnet
+    BINANCE_SPOT_BASE_URL = os.environ.get("BINANCE_SPOT_BASE_URL")
+    BINANCE_FUTURES_BASE_URL = os.environ.get("BINANCE_FUTURES_BASE_URL")
+
+    ORDER_PIPELINE_WORKERS = 4
+    ORDER_CONFIRM_TIMEOUT = 30
+
+    LATEST_BLOCK_TTL = 3
+    RECEIPT_PENDING_TTL = 5
+    RECEIPT_NEGATIVE_TTL = 10
+    RPC_BATCH_WINDOW = 0.01  # seconds a JSON-RPC batch waits for other calls
+
+    # block the signals contract was deployed in, the indexer won't start without it
+    INDEXER_START_BLOCK = (
+        int(os.environ["INDEXER_START_BLOCK"])
+        if os.environ.get("INDEXER_START_BLOCK")
+        else None
+    )
+    INDEXER_BLOCK_RANGE = 2000
+    INDEXER_POLL_INTERVAL = 5
+    # verify purchases the indexer hasn't seen yet against the node
+    INDEXER_RPC_FALLBACK = os.environ.get("INDEXER_RPC_FALLBACK", "").lower() in (
+        "1",
+        "true",
+    )
+
+    TELEGRAM_BASE_URL = os.environ.get(
+        "TELEGRAM_BASE_URL", "https://api.telegram.org/bot"
+    )
+    TELEGRAM_QUEUE_SIZE = 100
+    TELEGRAM_COALESCE_WINDOW = 2  # seconds a burst of notifications is merged over
+    TELEGRAM_MIN_INTERVAL = 3  # channels allow about 20 messages per minute
+
+    STREAM_HEARTBEAT_INTERVAL = 15
+    STREAM_MAX_DURATION = 300  # clients reconnect after, picking up config changes
+    STREAM_MAX_CONNECTIONS_PER_USER = 3
+    STREAM_QUEUE_SIZE = 100
+
     FLASK_ADMIN_SWATCH = "slate"
 
     TIMEZONE = "UTC"
@@ -0,0 +1,95 @@
+from cryptography.fernet import Fernet
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+import hashlib
+import os
+
+
+KEY = os.getenv("FERNET_KEY")
+
+kryptr = Fernet(KEY.encode("utf-8"))
+
+
+def encrypt_credential(value):
+    return kryptr.encrypt(value.encode("utf-8")).decode("utf-8")
+
+
+def decrypt_credential(value):
+    return kryptr.decrypt(value.encode("utf-8")).decode("utf-8")
+
+
+def ciphertext_fingerprint(api_key, api_secret):
+    return hashlib.blake2b(
+        f"{api_key}:{api_secret}".encode("utf-8"), digest_size=16
+    ).digest()
+
+
+class ApiCredentialCache:
+    """
+    Short lived, bounded cache of decrypted user api credentials.
+
+    Entries are keyed by user id and only served while the user's stored
+    ciphertext still has the same fingerprint, so repeated trades skip the
+    Fernet HMAC and AES work. Plaintext is held in bytearrays that are zeroed
+    when an entry is evicted, the str copies handed to callers can't be.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 60
+        self.max_size = 1024
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config["CREDENTIAL_CACHE_TTL"]
+        self.max_size = app.config["CREDENTIAL_CACHE_SIZE"]
+
+    def get(self, user):
+        """
+        :param user: User with encrypted api_key and api_secret
+        :return: (api_key, api_secret) in plaintext
+        """
+        fingerprint = ciphertext_fingerprint(user.api_key, user.api_secret)
+        now = monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(user.id)
+            if entry and entry[0] == fingerprint:
+                return entry[2].decode("utf-8"), entry[3].decode("utf-8")
+
+        api_key = decrypt_credential(user.api_key)
+        api_secret = decrypt_credential(user.api_secret)
+        entry = (
+            fingerprint,
+            now + self.ttl,
+            bytearray(api_key.encode("utf-8")),
+            bytearray(api_secret.encode("utf-8")),
+        )
+        with self._lock:
+            self._zero(self._entries.pop(user.id, None))
+            self._entries[user.id] = entry
+            while len(self._entries) > self.max_size:
+                self._zero(self._entries.popitem(last=False)[1])
+        return api_key, api_secret
+
+    def evict(self, user_id):
+        with self._lock:
+            self._zero(self._entries.pop(user_id, None))
+
+    def _evict_expired(self, now):
+        # entries share one ttl, so insertion order is expiry order
+        while self._entries:
+            user_id, entry = next(iter(self._entries.items()))
+            if entry[1] > now:
+                break
+            self._zero(self._entries.pop(user_id))
+
+    @staticmethod
+    def _zero(entry):
+        if entry is None:
+            return
+        for plaintext in entry[2:]:
+            plaintext[:] = bytes(len(plaintext))
@@ -0,0 +1,145 @@
+from collections import Counter, defaultdict
+from queue import Queue, Empty, Full
+from threading import Lock
+from flask import current_app
+from sqlalchemy import event
+import redis
+import os
+
+
+HEARTBEAT = ": keepalive\n\n"
+PENDING_EVENTS = "pending_events"
+
+
+def format_sse(event_name, data):
+    """Frame data as a server-sent event, must run in an app context"""
+    return f"event: {event_name}\ndata: {current_app.json.dumps(data)}\n\n"
+
+
+class EventBroker:
+    """
+    Publish/subscribe channel for the server-sent event streams.
+
+    Uses Redis pub/sub when REDIS is set so events reach the streams of every
+    worker, otherwise only the streams of the publishing process. Events
+    queued with publish_after_commit are only published once the session's
+    transaction commits, and dropped if it rolls back.
+    """
+
+    def __init__(self, db, app=None):
+        self.redis = None
+        self.queue_size = 100
+        self.max_connections = 3
+        self._subscribers = defaultdict(set)
+        self._connections = Counter()
+        self._lock = Lock()
+        self._session_info = lambda: db.session.info
+        event.listen(db.session, "after_commit", self._publish_pending)
+        event.listen(db.session, "after_transaction_end", self._discard_pending)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = os.environ.get("REDIS")
+        self.redis = redis.Redis.from_url(url) if url else None
+        self.queue_size = app.config["STREAM_QUEUE_SIZE"]
+        self.max_connections = app.config["STREAM_MAX_CONNECTIONS_PER_USER"]
+
+    def publish(self, channel, message):
+        if self.redis is not None:
+            try:
+                self.redis.publish(channel, message)
+            except redis.RedisError:
+                current_app.logger.exception(f"Publishing to {channel} failed")
+            return
+        with self._lock:
+            queues = list(self._subscribers.get(channel, ()))
+        for queue in queues:
+            try:
+                queue.put_nowait(message)
+            except Full:
+                pass  # a stalled client misses events rather than holding memory
+
+    def publish_event(self, channel, event_name, data):
+        self.publish(channel, format_sse(event_name, data))
+
+    def publish_after_commit(self, channel, event_name, data):
+        self._session_info().setdefault(PENDING_EVENTS, []).append(
+            (channel, format_sse(event_name, data))
+        )
+
+    def can_subscribe(self, owner):
+        """Whether owner is below the connection limit in this process, reserves nothing"""
+        with self._lock:
+            return self._connections[owner] < self.max_connections
+
+    def subscribe(self, channels, owner):
+        """
+        :param owner: id the connection limit is counted against
+        :return: a subscription, None if owner has too many open in this process
+        """
+        with self._lock:
+            if self._connections[owner] >= self.max_connections:
+                return None
+            self._connections[owner] += 1
+        if self.redis is not None:
+            return _RedisSubscription(self, channels, owner)
+        return _LocalSubscription(self, channels, owner)
+
+    def _release(self, owner):
+        with self._lock:
+            self._connections[owner] -= 1
+            if self._connections[owner] <= 0:
+                del self._connections[owner]
+
+    def _publish_pending(self, session):
+        for channel, message in session.info.pop(PENDING_EVENTS, ()):
+            self.publish(channel, message)
+
+    @staticmethod
+    def _discard_pending(session, transaction):
+        if transaction.parent is None:
+            session.info.pop(PENDING_EVENTS, None)
+
+
+class _LocalSubscription:
+    def __init__(self, broker, channels, owner):
+        self.broker = broker
+        self.channels = channels
+        self.owner = owner
+        self.queue = Queue(broker.queue_size)
+        with broker._lock:
+            for channel in channels:
+                broker._subscribers[channel].add(self.queue)
+
+    def get(self, timeout):
+        """:return: the next message, None if nothing arrived within timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def close(self):
+        with self.broker._lock:
+            for channel in self.channels:
+                self.broker._subscribers[channel].discard(self.queue)
+                if not self.broker._subscribers[channel]:
+                    del self.broker._subscribers[channel]
+        self.broker._release(self.owner)
+
+
+class _RedisSubscription:
+    def __init__(self, broker, channels, owner):
+        self.broker = broker
+        self.owner = owner
+        self.pubsub = broker.redis.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(*channels)
+
+    def get(self, timeout):
+        """:return: the next message, None if nothing arrived within timeout"""
+        message = self.pubsub.get_message(timeout=timeout)
+        return message["data"].decode("utf-8") if message else None
+
+    def close(self):
+        self.pubsub.close()
+        self.broker._release(self.owner)
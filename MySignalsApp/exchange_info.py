@@ -0,0 +1,275 @@
+from flask import current_app
+from MySignalsApp import cache, binance_clients
+from threading import Lock, Thread
+from time import monotonic, sleep, time
+from random import uniform
+from array import array
+from uuid import uuid4
+import json
+import sys
+import os
+
+
+_on_demand_lock = Lock()
+_last_on_demand_load = None
+
+MISSING = -1
+
+PRECISION_CACHE_KEY = "exchange_precision"
+PRECISION_VERSION_CACHE_KEY = "exchange_precision_version"
+PRECISION_REFRESHED_AT_CACHE_KEY = "exchange_precision_refreshed_at"
+# fraction of the refresh interval the refresher's sleeps vary by
+REFRESH_JITTER = 0.1
+
+
+def count_decimals(min_qty):
+    """Decimal places of a minQty string, 0 for whole quantities"""
+    strpd_precision = (
+        str(min_qty).rstrip("0").rstrip(".") if "." in min_qty else min_qty
+    )
+    return max(strpd_precision[::-1].find("."), 0)
+
+
+class PrecisionIndex:
+    """
+    Immutable symbol -> (spot_decimals, futures_decimals) table.
+
+    Symbols are interned and map to a slot of two signed char arrays, so the
+    whole exchange fits in a few KB. An index is never mutated once built,
+    a refresh builds a new one and swaps the module reference, which lets
+    request threads read it without locking.
+    """
+
+    __slots__ = ("version", "_slots", "_spot", "_futures")
+
+    def __init__(self, spot_min_qty, futures_min_qty, version=None):
+        """
+        :param spot_min_qty: dict of spot symbol -> minQty
+        :param futures_min_qty: dict of futures symbol -> minQty
+        :param version: id of the shared cache entry the index was built from
+        """
+        symbols = {}
+        for symbol in (*spot_min_qty, *futures_min_qty):
+            symbols.setdefault(sys.intern(symbol), len(symbols))
+        self.version = version
+        self._slots = symbols
+        self._spot = array("b", [MISSING]) * len(symbols)
+        self._futures = array("b", [MISSING]) * len(symbols)
+        for decimals, min_qtys in (
+            (self._spot, spot_min_qty),
+            (self._futures, futures_min_qty),
+        ):
+            for symbol, min_qty in min_qtys.items():
+                decimals[symbols[symbol]] = count_decimals(min_qty)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def get(self, pair, order_type):
+        """
+        :return: decimal places of pair on the order_type market, MISSING if unknown
+        """
+        slot = self._slots.get(pair)
+        if slot is None:
+            return MISSING
+        return (self._futures if order_type == "futures" else self._spot)[slot]
+
+
+_precision_index = PrecisionIndex({}, {})
+
+
+def get_precision(pair, order_type):
+    precision = _precision_index.get(pair, order_type)
+    # another worker may have published newer exchange info since our index was built
+    if precision == MISSING and load_shared_precision():
+        precision = _precision_index.get(pair, order_type)
+    return precision
+
+
+def load_shared_precision():
+    """
+    Swap in the pair precisions last published to the cache by any worker.
+
+    Only the small version key is read unless it differs from the local index.
+
+    :return: True if a newer index was loaded
+    """
+    global _precision_index
+
+    version = cache.get(PRECISION_VERSION_CACHE_KEY)
+    if version is None or version == _precision_index.version:
+        return False
+    shared = cache.get(PRECISION_CACHE_KEY)
+    if not shared:
+        return False
+    version, spot_min_qty, futures_min_qty = shared
+    _precision_index = PrecisionIndex(spot_min_qty, futures_min_qty, version)
+    return True
+
+
+def usdt_min_qty(exchange_info):
+    """Extract the LOT_SIZE minQty of every USDT symbol of an exchange_info response"""
+    return [
+        {
+            "symbol": symbol["symbol"],
+            "minQty": [
+                filter_class["minQty"]
+                for filter_class in symbol["filters"]
+                if filter_class["filterType"] == "LOT_SIZE"
+            ][0],
+        }
+        for symbol in exchange_info["symbols"]
+        if symbol["quoteAsset"] == "USDT"
+    ]
+
+
+def set_precision(exchange_info):
+    """
+    Swap in new pair precisions and publish them to the other workers.
+
+    Every symbol goes into one cache entry written together with its version
+    key in a single set_many, instead of one cache write per symbol.
+    """
+    global _precision_index
+
+    (spot_, futures_) = exchange_info
+    spot_min_qty = {s_info["symbol"]: s_info["minQty"] for s_info in spot_}
+    futures_min_qty = {f_info["symbol"]: f_info["minQty"] for f_info in futures_}
+    version = uuid4().hex
+    _precision_index = PrecisionIndex(spot_min_qty, futures_min_qty, version)
+    cache.set_many(
+        {
+            PRECISION_CACHE_KEY: (version, spot_min_qty, futures_min_qty),
+            PRECISION_VERSION_CACHE_KEY: version,
+        }
+    )
+
+
+def fetch_exchange_info():
+    spot_client = binance_clients.spot()
+    futures_client = binance_clients.futures()
+
+    return (
+        spot_client.exchange_info(permissions=["SPOT"]),
+        futures_client.exchange_info(),
+    )
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(path, exchange_info):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(exchange_info, f)
+    os.replace(tmp_path, path)
+
+
+def load_precision_snapshot(app):
+    """
+    Set pair precisions from the shared cache, or the exchange info snapshots on disk.
+
+    :return: True if precisions were found
+    """
+    if load_shared_precision():
+        return True
+    spot_info = read_snapshot(app.config["SPOT_EXCHANGE_INFO_SNAPSHOT"])
+    futures_info = read_snapshot(app.config["FUTURES_EXCHANGE_INFO_SNAPSHOT"])
+    # publishing nothing would hide precisions another worker is about to share
+    if not (spot_info or futures_info):
+        return False
+    set_precision(
+        (
+            usdt_min_qty(spot_info) if spot_info else [],
+            usdt_min_qty(futures_info) if futures_info else [],
+        )
+    )
+    return True
+
+
+def refresh_precision(app):
+    """Set pair precisions from live exchange info and save it as the new snapshot"""
+    spot_info, futures_info = fetch_exchange_info()
+    set_precision((usdt_min_qty(spot_info), usdt_min_qty(futures_info)))
+    write_snapshot(app.config["SPOT_EXCHANGE_INFO_SNAPSHOT"], spot_info)
+    write_snapshot(app.config["FUTURES_EXCHANGE_INFO_SNAPSHOT"], futures_info)
+    cache.set(PRECISION_REFRESHED_AT_CACHE_KEY, time())
+
+
+def load_precision_on_demand():
+    """
+    Refresh pair precisions from Binance after a lookup missed.
+
+    Loads run one at a time and at most once per EXCHANGE_INFO_MIN_RELOAD_INTERVAL,
+    so lookups of unknown pairs can't flood Binance.
+    """
+    global _last_on_demand_load
+
+    app = current_app._get_current_object()
+    with _on_demand_lock:
+        if (
+            _last_on_demand_load is not None
+            and monotonic() - _last_on_demand_load
+            < app.config["EXCHANGE_INFO_MIN_RELOAD_INTERVAL"]
+        ):
+            return
+        _last_on_demand_load = monotonic()
+        refresh_precision(app)
+
+
+def precision_age(app):
+    """:return: seconds since any worker last refreshed pair precisions from Binance"""
+    refreshed_at = cache.get(PRECISION_REFRESHED_AT_CACHE_KEY)
+    if refreshed_at is None:
+        try:
+            refreshed_at = os.path.getmtime(app.config["SPOT_EXCHANGE_INFO_SNAPSHOT"])
+        except OSError:
+            return float("inf")
+    return time() - refreshed_at
+
+
+def start_precision_refresher(app):
+    """
+    Refresh pair precisions from Binance in the background every interval.
+
+    The thread starts with the first request a process serves, so CLI
+    commands never run it and forked workers each get their own. It sleeps
+    before every refresh, jittered so workers started together spread out,
+    and skips the refresh when another worker did it within the interval.
+    """
+    interval = app.config["EXCHANGE_INFO_REFRESH_INTERVAL"]
+    if not interval:
+        return
+    lock = Lock()
+    started_pid = None
+
+    def refresh_forever():
+        while True:
+            sleep(interval * uniform(1 - REFRESH_JITTER, 1 + REFRESH_JITTER))
+            try:
+                with app.app_context():
+                    if precision_age(app) >= interval:
+                        refresh_precision(app)
+                    else:
+                        load_shared_precision()
+            except Exception:
+                app.logger.exception("Exchange info refresh failed")
+
+    @app.before_request
+    def ensure_refresher():
+        nonlocal started_pid
+        # a forked worker inherits the flag but not the thread
+        if started_pid == os.getpid():
+            return
+        with lock:
+            if started_pid != os.getpid():
+                started_pid = os.getpid()
+                Thread(
+                    target=refresh_forever, name="exchange-info-refresher", daemon=True
+                ).start()
@@ -0,0 +1,245 @@
+from MySignalsApp.models.users import User
+from MySignalsApp.models.signals import Signal
+from MySignalsApp.models.placed_signals import PlacedSignals
+from MySignalsApp.models.notifications import Notification
+from MySignalsApp.models.provider_ratings import ProviderRating
+from MySignalsApp.models.compensations import Compensation
+from MySignalsApp.models.indexer_checkpoints import IndexerCheckpoint
+from MySignalsApp.errors.handlers import UtilError
+from MySignalsApp.web3_helpers import (
+    w3,
+    contract,
+    COMPENSATE_PROVIDER,
+    REQUIRED_CONFIRMATIONS,
+)
+from sqlalchemy.exc import IntegrityError
+from MySignalsApp import db
+from time import sleep
+
+
+CHECKPOINT_NAME = "compensate_provider"
+MAX_SIGNAL_ID = 2**31 - 1
+MAX_USER_ID_LENGTH = 34
+
+
+def record_purchase(user, signal, tx_hash):
+    """
+    Add a purchase with its rating delta and notifications to the session.
+
+    The caller is responsible for committing.
+
+    :return: False if the user had already purchased the signal
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.add(PlacedSignals(user.id, signal.id, tx_hash))
+    except IntegrityError:
+        return False
+    ProviderRating.record(signal.provider, unrated_count=1)
+    notifications = [
+        (user.id, f"You Successfully purchased signal {signal.id}"),
+        (signal.provider, f"Your Signal {signal.id} was purchased"),
+    ]
+    if user.referrer:
+        notifications.append(
+            (
+                user.referrer.id,
+                f"You Earned referral Bonus from {user.user_name} on signal {signal.id}",
+            )
+        )
+    Notification.notify_many(notifications)
+    return True
+
+
+def same_address(address, other):
+    return bool(address and other) and (
+        w3.to_checksum_address(address) == w3.to_checksum_address(other)
+    )
+
+
+def verify_indexed_compensation(tx_hash, provider, user_id, signal_id):
+    """
+    Check a purchase against the indexed CompensateProvider events of tx_hash.
+
+    :return: False if the transaction hasn't been indexed (yet)
+    """
+    compensations = (
+        db.session.execute(db.select(Compensation).filter_by(tx_hash=tx_hash.lower()))
+        .scalars()
+        .all()
+    )
+    if not compensations:
+        return False
+    for compensation in compensations:
+        if (
+            compensation.signal_id == signal_id
+            and compensation.user_id == user_id
+            and same_address(compensation.provider, provider)
+        ):
+            return True
+    raise UtilError(
+        "Forbidden", 403, "Invalid Transaction, compensation details do not match"
+    )
+
+
+def fetch_compensations(from_block, to_block):
+    """Decoded CompensateProvider events of the contract within a block range"""
+    logs = w3.eth.get_logs(
+        {
+            "address": contract.address,
+            "topics": [w3.to_hex(COMPENSATE_PROVIDER.topic)],
+            "fromBlock": from_block,
+            "toBlock": to_block,
+        }
+    )
+    compensations = []
+    for log in logs:
+        event = COMPENSATE_PROVIDER.decode(log)
+        args = event.args
+        # events that can't reference a signal or user of ours are never purchases
+        if args.signalId > MAX_SIGNAL_ID or len(args.userId) > MAX_USER_ID_LENGTH:
+            continue
+        compensations.append(
+            Compensation(
+                event.transactionHash.hex().lower(),
+                event.logIndex,
+                event.blockNumber,
+                event.address,
+                args.provider,
+                args.referrer,
+                args.amount,
+                args.signalId,
+                args.userId,
+            )
+        )
+    return compensations
+
+
+def record_compensated_purchases(compensations):
+    """Add the purchases paid for by compensations that weren't recorded yet"""
+    if not compensations:
+        return 0
+    signals = {
+        signal.id: signal
+        for signal in db.session.execute(
+            db.select(Signal)
+            .options(db.joinedload(Signal.user))
+            .filter(Signal.id.in_({c.signal_id for c in compensations}))
+        ).scalars()
+    }
+    users = {
+        user.id: user
+        for user in db.session.execute(
+            db.select(User).filter(User.id.in_({c.user_id for c in compensations}))
+        ).scalars()
+    }
+    placed = set(
+        db.session.execute(
+            db.select(PlacedSignals.user_id, PlacedSignals.signal_id).filter(
+                PlacedSignals.user_id.in_(users.keys()),
+                PlacedSignals.signal_id.in_(signals.keys()),
+            )
+        ).all()
+    )
+
+    recorded = 0
+    for compensation in compensations:
+        signal = signals.get(compensation.signal_id)
+        user = users.get(compensation.user_id)
+        if (
+            not (signal and user)
+            or (user.id, signal.id) in placed
+            or not same_address(compensation.provider, signal.user.wallet)
+        ):
+            continue
+        placed.add((user.id, signal.id))
+        recorded += record_purchase(user, signal, compensation.tx_hash)
+    return recorded
+
+
+def index_compensations(from_block, to_block):
+    """
+    Store the CompensateProvider events of a block range and their purchases.
+
+    :return: (new events, new purchases)
+    """
+    compensations = fetch_compensations(from_block, to_block)
+    existing = (
+        set(
+            db.session.execute(
+                db.select(Compensation.tx_hash, Compensation.log_index).filter(
+                    Compensation.tx_hash.in_({c.tx_hash for c in compensations})
+                )
+            ).all()
+        )
+        if compensations
+        else set()
+    )
+    compensations = [
+        c for c in compensations if (c.tx_hash, c.log_index) not in existing
+    ]
+    db.session.add_all(compensations)
+    return len(compensations), record_compensated_purchases(compensations)
+
+
+def has_checkpoint():
+    return (
+        db.session.execute(
+            db.select(IndexerCheckpoint.id).filter_by(name=CHECKPOINT_NAME)
+        ).first()
+        is not None
+    )
+
+
+def index_next_range(app):
+    """
+    Index the next block range after the checkpoint, in one transaction.
+
+    Only blocks with REQUIRED_CONFIRMATIONS are indexed, the checkpoint row
+    is locked so concurrent indexers can't process the same range twice.
+
+    :return: True once the indexer has caught up
+    """
+    checkpoint = db.session.execute(
+        db.select(IndexerCheckpoint).filter_by(name=CHECKPOINT_NAME).with_for_update()
+    ).scalar_one_or_none()
+    if not checkpoint:
+        checkpoint = IndexerCheckpoint(
+            CHECKPOINT_NAME, app.config["INDEXER_START_BLOCK"] - 1
+        )
+        db.session.add(checkpoint)
+
+    safe_block = w3.eth.block_number - REQUIRED_CONFIRMATIONS
+    if checkpoint.block_number >= safe_block:
+        db.session.rollback()
+        return True
+
+    from_block = checkpoint.block_number + 1
+    to_block = min(
+        checkpoint.block_number + app.config["INDEXER_BLOCK_RANGE"], safe_block
+    )
+    events, purchases = index_compensations(from_block, to_block)
+    checkpoint.block_number = to_block
+    db.session.commit()
+    if events:
+        app.logger.info(
+            f"Indexed blocks {from_block}-{to_block}: {events} compensations, {purchases} purchases"
+        )
+    return to_block == safe_block
+
+
+def run_indexer(app, once=False):
+    """Follow the contract's CompensateProvider events until stopped"""
+    while True:
+        try:
+            caught_up = index_next_range(app)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Compensation indexer failed")
+            if once:
+                raise
+            caught_up = True
+        if caught_up:
+            if once:
+                return
+            sleep(app.config["INDEXER_POLL_INTERVAL"])
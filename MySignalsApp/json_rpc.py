@@ -0,0 +1,119 @@
+from threading import Event, Lock
+from time import sleep
+import requests
+
+
+class JsonRpcBatcher:
+    """
+    Coalesce JSON-RPC calls made by concurrent requests into batch POSTs.
+
+    The first caller to arrive becomes the leader and sends everything
+    queued as one JSON-RPC batch, handing each caller its own result. While
+    another batch is in flight the leader first waits a short window for
+    other callers to queue their calls, an idle batcher sends right away.
+    Callers arriving after the leader took the queue start the next batch.
+
+    Single calls go through the provider's make_request, batches are posted
+    to its endpoint with its request kwargs on a session of their own.
+    """
+
+    def __init__(self, provider):
+        """
+        :param provider: web3 HTTPProvider the batches are posted to
+        """
+        self.provider = provider
+        self._queue = []
+        self._leading = False
+        self._in_flight = 0
+        self._session = requests.Session()
+        self._lock = Lock()
+
+    def call(self, method, params, window=0):
+        return self.call_many([(method, params)], window)[0]
+
+    def call_many(self, calls, window=0):
+        """
+        :param calls: list of (method, params)
+        :param window: seconds a leader waits for other calls to join its batch
+        :return: list of results in the order of calls
+        """
+        pending = [_PendingCall(method, params) for method, params in calls]
+        with self._lock:
+            self._queue.extend(pending)
+            leader = not self._leading
+            self._leading = True
+
+        if leader:
+            # concurrent callers are only likely while other batches are out
+            if window and self._in_flight:
+                sleep(window)
+            with self._lock:
+                batch, self._queue = self._queue, []
+                self._leading = False
+                self._in_flight += 1
+            try:
+                self._send(batch)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        timeout = self._request_kwargs()["timeout"] + window
+        results = []
+        for call in pending:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"JSON-RPC {call.method} was not answered in time")
+            if call.error is not None:
+                raise ValueError(call.error)
+            results.append(call.result)
+        return results
+
+    def _request_kwargs(self):
+        return {"timeout": 10, **self.provider.get_request_kwargs()}
+
+    def _send(self, batch):
+        try:
+            if len(batch) == 1:
+                responses = {
+                    0: self.provider.make_request(batch[0].method, batch[0].params)
+                }
+            else:
+                response = self._session.post(
+                    self.provider.endpoint_uri,
+                    json=[
+                        {
+                            "jsonrpc": "2.0",
+                            "id": request_id,
+                            "method": call.method,
+                            "params": call.params,
+                        }
+                        for request_id, call in enumerate(batch)
+                    ],
+                    **self._request_kwargs(),
+                )
+                response.raise_for_status()
+                responses = {item.get("id"): item for item in response.json()}
+            for request_id, call in enumerate(batch):
+                response = responses.get(request_id)
+                if response is None:
+                    call.error = {"message": "Missing JSON-RPC response"}
+                elif "error" in response:
+                    call.error = response["error"]
+                else:
+                    call.result = response.get("result")
+        except Exception as e:
+            for call in batch:
+                call.error = {"message": str(e)}
+        finally:
+            for call in batch:
+                call.done.set()
+
+
+class _PendingCall:
+    __slots__ = ("method", "params", "result", "error", "done")
+
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.result = None
+        self.error = None
+        self.done = Event()
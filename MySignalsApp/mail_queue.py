@@ -0,0 +1,155 @@
+from queue import Queue, Empty, Full
+from collections import deque
+from threading import Lock, Thread
+from time import monotonic, sleep
+import smtplib
+import os
+
+
+class MailQueue:
+    """
+    Bounded pool of workers delivering Flask-Mail messages in the background.
+
+    Each worker keeps one authenticated SMTP connection open while there is
+    mail to send, delivers up to MAIL_BATCH_SIZE queued messages over it and
+    closes it after MAIL_CONNECTION_IDLE_TIMEOUT without mail. A send failing
+    on SMTP or the network reconnects and retries with exponential backoff, up
+    to MAIL_MAX_RETRIES, any other error drops that message at once.
+    """
+
+    def __init__(self, mail, app=None):
+        self.mail = mail
+        self.app = None
+        self.workers = 2
+        self.queue_size = 1000
+        self.batch_size = 20
+        self.max_retries = 3
+        self.retry_delay = 1
+        self.idle_timeout = 30
+        self._queue = None
+        self._pid = None
+        self._lock = Lock()
+        self._stats_lock = Lock()
+        self._counts = dict(sent=0, failed=0, retried=0, dropped=0)
+        self._latencies = deque(maxlen=100)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config["MAIL_QUEUE_WORKERS"]
+        self.queue_size = app.config["MAIL_QUEUE_SIZE"]
+        self.batch_size = app.config["MAIL_BATCH_SIZE"]
+        self.max_retries = app.config["MAIL_MAX_RETRIES"]
+        self.retry_delay = app.config["MAIL_RETRY_DELAY"]
+        self.idle_timeout = app.config["MAIL_CONNECTION_IDLE_TIMEOUT"]
+
+    def send(self, msg):
+        """Queue a message for delivery, it is dropped if the queue is full"""
+        try:
+            self._ensure_workers().put_nowait(_QueuedMail(msg))
+        except Full:
+            self._count("dropped")
+            self.app.logger.error(
+                f"Mail queue is full, dropped mail to {msg.recipients}"
+            )
+
+    def stats(self):
+        """Queue depth, delivery counts and latencies in seconds from queueing to sent"""
+        with self._stats_lock:
+            latencies = list(self._latencies)
+            counts = dict(self._counts)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "workers": self.workers,
+            **counts,
+            "latency_avg": round(sum(latencies) / len(latencies), 3)
+            if latencies
+            else None,
+            "latency_max": round(max(latencies), 3) if latencies else None,
+        }
+
+    def _ensure_workers(self):
+        # a forked worker inherits the attributes but not the threads
+        with self._lock:
+            if self._queue is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = Queue(self.queue_size)
+                for number in range(self.workers):
+                    Thread(
+                        target=self._work, name=f"mail-queue-{number}", daemon=True
+                    ).start()
+            return self._queue
+
+    def _count(self, name, latency=None):
+        with self._stats_lock:
+            self._counts[name] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def _work(self):
+        queue, connection = self._queue, None
+        with self.app.app_context():
+            while True:
+                try:
+                    queued = queue.get(
+                        timeout=self.idle_timeout if connection else None
+                    )
+                except Empty:
+                    connection = self._disconnect(connection)
+                    continue
+                batch = [queued]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(queue.get_nowait())
+                    except Empty:
+                        break
+                for queued in batch:
+                    connection = self._deliver(connection, queued)
+
+    def _deliver(self, connection, queued):
+        """Send one message over the worker's connection, reconnecting to retry"""
+        while True:
+            try:
+                if connection is None:
+                    connection = self.mail.connect().__enter__()
+                connection.send(queued.msg)
+                self._count("sent", monotonic() - queued.queued_at)
+                return connection
+            except (smtplib.SMTPException, OSError):
+                connection = self._disconnect(connection)
+                queued.attempts += 1
+                if queued.attempts > self.max_retries:
+                    self._count("failed")
+                    self.app.logger.exception(
+                        f"Mail to {queued.msg.recipients} failed {queued.attempts} times"
+                    )
+                    return connection
+                self._count("retried")
+                sleep(self.retry_delay * 2 ** (queued.attempts - 1))
+            except Exception:
+                # a message that can't be built or sent won't succeed on a retry,
+                # drop it rather than the worker and the rest of its batch
+                connection = self._disconnect(connection)
+                self._count("failed")
+                self.app.logger.exception(f"Mail to {queued.msg.recipients} failed")
+                return connection
+
+    @staticmethod
+    def _disconnect(connection):
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+        return None
+
+
+class _QueuedMail:
+    __slots__ = ("msg", "queued_at", "attempts")
+
+    def __init__(self, msg):
+        self.msg = msg
+        self.queued_at = monotonic()
+        self.attempts = 0
@@ -3,8 +3,17 @@ from MySignalsApp.models.provider_application import ProviderApplication
 from MySignalsApp.models.base import get_uuid
 from MySignalsApp.models.signals import Signal
 from MySignalsApp.models.placed_signals import PlacedSignals
-from MySignalsApp.models.notifications import Notification
-from flask import jsonify, Blueprint, request, session, current_app, send_from_directory
+from MySignalsApp.models.provider_ratings import ProviderRating
+from flask import (
+    jsonify,
+    Blueprint,
+    Response,
+    request,
+    session,
+    current_app,
+    g,
+    send_from_directory,
+)
 from MySignalsApp.schemas import (
     ValidTxSchema,
     PageQuerySchema,
@@ -13,54 +22,52 @@ from MySignalsApp.schemas import (
     TpSchema,
     ProviderApplicationSchema,
 )
-from binance.um_futures import UMFutures
-from cryptography.fernet import Fernet
 from binance.error import ClientError
 from MySignalsApp.utils import (
-    query_paginate_filtered,
+    query_listing_filtered,
+    pagination_meta,
     has_permission,
+    permission_required,
     query_one_filtered,
-    calculate_rating,
+    calculate_ratings,
     has_api_keys,
-    is_active,
 )
-from binance.spot import Spot
 from MySignalsApp.errors.handlers import UtilError
 from MySignalsApp.web3_helpers import (
     verify_compensation_details,
     prepare_spot_trade,
     prepare_futures_trade,
 )
-from MySignalsApp import db
-from time import sleep
+from MySignalsApp.indexer import record_purchase, verify_indexed_compensation
+from MySignalsApp.event_broker import format_sse, HEARTBEAT
+from MySignalsApp import db, binance_clients, api_credentials, event_broker
+from MySignalsApp.order_pipeline import place_protective_orders, get_tracking_status
+from time import monotonic
 import os
 
 
 main = Blueprint("main", __name__)
 
-KEY = os.getenv("FERNET_KEY")
-
-kryptr = Fernet(KEY.encode("utf-8"))
-
 
 @main.route("/")
 def get_active_signals():
     _ = has_permission(session, "User")
-    page = PageQuerySchema(page=request.args.get("page", 1))
+    page = PageQuerySchema(
+        page=request.args.get("page", 1),
+        cursor=request.args.get("cursor"),
+        with_total=request.args.get("with_total", False),
+    )
     try:
-        signals = query_paginate_filtered(Signal, page.page, status=True)
+        signals = query_listing_filtered(
+            Signal, page, options=[db.joinedload(Signal.user)], status=True
+        )
+        ratings = calculate_ratings(signal.provider for signal in signals.items)
 
         filtered_signals = (
             [
                 {
-                    **signal.format(),
-                    "signal": {
-                        "symbol": signal.signal.get("symbol"),
-                        "side": signal.signal.get("side"),
-                        "quantity": signal.signal.get("quantity"),
-                    },
-                    "short_text": None,
-                    "provider_rating": calculate_rating(signal.provider),
+                    **signal.format_preview(),
+                    "provider_rating": ratings[signal.provider],
                 }
                 for signal in signals
             ]
@@ -73,8 +80,7 @@ def get_active_signals():
                 {
                     "message": "Success",
                     "signals": filtered_signals,
-                    "total": signals.total,
-                    "pages": signals.pages,
+                    **pagination_meta(signals),
                     "status": True,
                 }
             ),
@@ -95,16 +101,16 @@ def get_active_signals():
 
 
 @main.route("/spot/trade/<int:signal_id>", methods=["POST"])
+@permission_required("User")
 def place_spot_trade(signal_id):
-    user_id = has_permission(session, "User")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
 
     has_api_keys(user)
 
-    user_api_key = kryptr.decrypt((user.api_key).encode("utf-8")).decode("utf-8")
-    user_api_secret = kryptr.decrypt((user.api_secret).encode("utf-8")).decode("utf-8")
+    user_api_key, user_api_secret = api_credentials.get(user)
 
-    spot_client = Spot(api_key=user_api_key, api_secret=user_api_secret)
+    spot_client = binance_clients.spot(user_api_key, user_api_secret)
 
     trade_uuid = get_uuid()
     signal_data = TpSchema(
@@ -147,21 +153,23 @@ def place_spot_trade(signal_id):
             signal, trade_uuid, signal_data.tp, signal_data.quoteQty
         )
         trade = spot_client.new_order(**params)
-        sleep(1)
-        trade2 = spot_client.new_oco_order(**stop_params)
         placed_signal.order_id = trade_uuid
         placed_signal.update()
-        notify = Notification(
+        place_protective_orders(
+            trade_uuid,
             user.id,
+            "spot",
+            params["symbol"],
+            [("new_oco_order", stop_params)],
             f"Spot Signal {signal_data.id} order has been placed on your Binance Account",
         )
-        notify.insert()
 
         return (
             jsonify(
                 {
                     "message": "success",
                     "signal": {**params, "sl": stops.get("sl"), "tp": signal_data.tp},
+                    "tracking_id": trade_uuid,
                     "status": True,
                 }
             ),
@@ -193,16 +201,16 @@ def place_spot_trade(signal_id):
 
 
 @main.route("/futures/trade/<int:signal_id>", methods=["POST"])
+@permission_required("User")
 def place_futures_trade(signal_id):
-    user_id = has_permission(session, "User")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
 
     has_api_keys(user)
 
-    user_api_key = kryptr.decrypt((user.api_key).encode("utf-8")).decode("utf-8")
-    user_api_secret = kryptr.decrypt((user.api_secret).encode("utf-8")).decode("utf-8")
+    user_api_key, user_api_secret = api_credentials.get(user)
 
-    futures_client = UMFutures(key=user_api_key, secret=user_api_secret)
+    futures_client = binance_clients.futures(user_api_key, user_api_secret)
     trade_uuid = get_uuid()
     signal_data = TpSchema(
         id=signal_id,
@@ -245,16 +253,16 @@ def place_futures_trade(signal_id):
 
         lev = futures_client.change_leverage(signal["symbol"], signal["leverage"])
         futures_client.new_order(**params)
-        sleep(1)
-        futures_client.new_order(**stop_params)
-        futures_client.new_order(**tp_params)
         placed_signal.order_id = trade_uuid
         placed_signal.update()
-        notify = Notification(
+        place_protective_orders(
+            trade_uuid,
             user.id,
+            "futures",
+            params["symbol"],
+            [("new_order", stop_params), ("new_order", tp_params)],
             f"Futures Signal {signal_data.id} order has been placed on your Binance Account",
         )
-        notify.insert()
 
         return (
             jsonify(
@@ -266,6 +274,7 @@ def place_futures_trade(signal_id):
                         "tp": signal_data.tp,
                         "leverage": signal["leverage"],
                     },
+                    "tracking_id": trade_uuid,
                     "status": True,
                 }
             ),
@@ -297,41 +306,52 @@ def place_futures_trade(signal_id):
 
 
 @main.route("/signal/<int:signal_id>", methods=["GET", "POST"])
+@permission_required("User", db.joinedload(User.referrer))
 def get_signal(signal_id):
-    user_id = has_permission(session, "User")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
     data = request.args.get("tx_hash", None)
 
     signal_data = ValidTxSchema(id=signal_id, tx_hash=data)
 
     try:
-        signal = query_one_filtered(Signal, id=signal_data.id)
+        signal = db.session.get(
+            Signal, signal_data.id, options=[db.joinedload(Signal.user)]
+        )
 
         if not signal:
             raise UtilError("Resource Not found", 404, "This signal Id does not exist")
 
-        verify_compensation_details(
+        # a purchase already recorded, e.g. by the indexer, needs no verification
+        if db.session.execute(
+            db.select(PlacedSignals.id).filter_by(
+                signal_id=signal_data.id, user_id=user_id, tx_hash=signal_data.tx_hash
+            )
+        ).first():
+            return (
+                jsonify(
+                    {"message": "success", "signal": signal.format(), "status": True}
+                ),
+                200,
+            )
+
+        if not verify_indexed_compensation(
             signal_data.tx_hash, signal.user.wallet, user_id, signal_id
-        )
+        ):
+            if not current_app.config["INDEXER_RPC_FALLBACK"]:
+                raise UtilError(
+                    "Resource not found",
+                    404,
+                    "This transaction has not been indexed yet, try again shortly",
+                )
+            verify_compensation_details(
+                signal_data.tx_hash, signal.user.wallet, user_id, signal_id
+            )
         if not query_one_filtered(
             PlacedSignals, signal_id=signal_data.id, user_id=user_id
         ):
-            placed_signal = PlacedSignals(user_id, signal_data.id, signal_data.tx_hash)
-            notify_user = Notification(
-                user.id, f"You Successfully purchased signal {signal_data.id}"
-            )
-            notify_provider = Notification(
-                signal.user.id, f"Your Signal {signal_data.id} was purchased"
-            )
-            placed_signal.insert()
-            if user.referrer:
-                notify_referrer = Notification(
-                    user.referrer.id,
-                    f"You Earned referral Bonus from {user.user_name} on signal {signal_data.id}",
-                )
-                notify_referrer.insert()
-            notify_provider.insert()
-            notify_user.insert()
+            record_purchase(user, signal, signal_data.tx_hash)
+            db.session.commit()
 
         return (
             jsonify({"message": "success", "signal": signal.format(), "status": True}),
@@ -357,17 +377,20 @@ def get_signal(signal_id):
 
 
 @main.route("/signal/rate/<int:signal_id>", methods=["POST"])
+@permission_required("User")
 def rate_signal(signal_id):
-    user_id = has_permission(session, "User")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
     rating = request.get_json()
 
     signal_data = IntQuerySchema(id=signal_id)
     rating = RatingSchema(rate=rating.get("rate"))
     try:
-        placed_signal = query_one_filtered(
-            PlacedSignals, signal_id=signal_data.id, user_id=user_id
-        )
+        placed_signal = db.session.execute(
+            db.select(PlacedSignals)
+            .filter_by(signal_id=signal_data.id, user_id=user_id)
+            .with_for_update()
+        ).scalar_one_or_none()
 
         if not placed_signal:
             return (
@@ -381,7 +404,14 @@ def rate_signal(signal_id):
                 404,
             )
 
+        previous_rating = placed_signal.rating
         placed_signal.rating = rating.rate
+        ProviderRating.record(
+            placed_signal.signal.provider,
+            rating_sum=rating.rate - previous_rating,
+            rated_count=0 if previous_rating else 1,
+            unrated_count=0 if previous_rating else -1,
+        )
         placed_signal.update()
 
         return (
@@ -403,12 +433,22 @@ def rate_signal(signal_id):
 
 
 @main.route("/mytrades")
+@permission_required("User")
 def get_user_placed_signals():
-    user_id = has_permission(session, "User")
-    user = is_active(User, user_id)
-    page = PageQuerySchema(page=request.args.get("page", 1))
+    user = g.current_user
+    user_id = user.id
+    page = PageQuerySchema(
+        page=request.args.get("page", 1),
+        cursor=request.args.get("cursor"),
+        with_total=request.args.get("with_total", False),
+    )
 
-    placed_signals = query_paginate_filtered(PlacedSignals, page.page, user_id=user_id)
+    placed_signals = query_listing_filtered(
+        PlacedSignals,
+        page,
+        options=[db.joinedload(PlacedSignals.signal).joinedload(Signal.user)],
+        user_id=user_id,
+    )
 
     signal_data = (
         [
@@ -430,25 +470,84 @@ def get_user_placed_signals():
                 "message": "success",
                 "mytrades": signal_data,
                 "status": True,
-                "total": placed_signals.total,
-                "pages": placed_signals.pages,
+                **pagination_meta(placed_signals),
             }
         ),
         200,
     )
 
 
+@main.route("/mytrades/status/<string:tracking_id>")
+@permission_required("User")
+def get_trade_status(tracking_id):
+    user = g.current_user
+    user_id = user.id
+
+    status = get_tracking_status(tracking_id)
+    if not status or status["user_id"] != user_id:
+        raise UtilError("Resource Not found", 404, "No pending trade with this id")
+
+    return (
+        jsonify(
+            {
+                "message": "success",
+                "tracking_id": tracking_id,
+                "orders": status["status"],
+                "detail": status["message"],
+                "status": True,
+            }
+        ),
+        200,
+    )
+
+
+@main.route("/stream")
+@permission_required("User")
+def stream_events():
+    user = g.current_user
+    user_id = user.id
+
+    if not event_broker.can_subscribe(user_id):
+        raise UtilError("Too Many Requests", 429, "Too many open streams")
+    heartbeat = current_app.config["STREAM_HEARTBEAT_INTERVAL"]
+    max_duration = current_app.config["STREAM_MAX_DURATION"]
+    unread = format_sse("unread", {"unread_notifications": user.unread_notifications})
+    too_many = format_sse("error", {"message": "Too many open streams"})
+
+    def generate():
+        # subscribing on the first read, a response that is never sent holds no slot
+        subscription = event_broker.subscribe([f"user:{user_id}", "signals"], user_id)
+        if not subscription:
+            # streams opened since the check took the last slot
+            yield too_many
+            return
+        try:
+            yield unread
+            deadline = monotonic() + max_duration
+            while monotonic() < deadline:
+                message = subscription.get(timeout=heartbeat)
+                yield message if message else HEARTBEAT
+        finally:
+            subscription.close()
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @main.route("/mytrades/cancel/<int:signal_id>", methods=["POST"])
+@permission_required("User")
 def cancel_trade(signal_id):
-    user_id = has_permission(session, "User")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
 
     signal_data = IntQuerySchema(id=signal_id)
 
     has_api_keys(user)
 
-    user_api_key = kryptr.decrypt((user.api_key).encode("utf-8")).decode("utf-8")
-    user_api_secret = kryptr.decrypt((user.api_secret).encode("utf-8")).decode("utf-8")
+    user_api_key, user_api_secret = api_credentials.get(user)
     try:
         placed_signal = query_one_filtered(
             PlacedSignals, signal_id=signal_data.id, user_id=user_id
@@ -464,7 +563,7 @@ def cancel_trade(signal_id):
 
         signal = placed_signal.signal
         if signal.is_spot:
-            spot_client = Spot(api_key=user_api_key, api_secret=user_api_secret)
+            spot_client = binance_clients.spot(user_api_key, user_api_secret)
 
             spot_client.cancel_order(
                 signal.signal.get("symbol"), origClientOrderId=placed_signal.order_id
@@ -472,7 +571,7 @@ def cancel_trade(signal_id):
             placed_signal.is_cancelled = True
             placed_signal.update()
         else:
-            futures_client = UMFutures(key=user_api_key, secret=user_api_secret)
+            futures_client = binance_clients.futures(user_api_key, user_api_secret)
             futures_client.cancel_order(
                 symbol=signal.signal.get("symbol"),
                 origClientOrderId=placed_signal.order_id,
@@ -503,9 +602,10 @@ def cancel_trade(signal_id):
 
 
 @main.route("/apply/provider", methods=["POST"])
+@permission_required("User")
 def apply_provider():
-    user_id = has_permission(session, "User")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
     data = ProviderApplicationSchema(**request.get_json())
     if query_one_filtered(ProviderApplication, user_id=user_id):
         raise UtilError("Forbidden", 403, "You have already applied in the past")
@@ -1,5 +1,5 @@
 from flask_admin import BaseView, expose
-from MySignalsApp import db, admin, bcrypt
+from MySignalsApp import db, admin, passwords
 from flask_admin.contrib.sqla import ModelView
 from wtforms import EmailField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Email
@@ -10,6 +10,7 @@ from MySignalsApp.models.signals import Signal
 from MySignalsApp.models.provider_application import ProviderApplication
 from MySignalsApp.models.placed_signals import PlacedSignals
 from MySignalsApp.models.notifications import Notification
+from MySignalsApp.models.provider_ratings import ProviderRating
 from flask_wtf import FlaskForm
 
 
@@ -30,11 +31,12 @@ class AdminLoginView(BaseView):
                 flash("One or more missing fields", category="error")
                 return redirect("/admin/login", 302)
             user = query_one_filtered(User, email=email)
-            if not user or not bcrypt.check_password_hash(user.password, password):
+            if not passwords.check(user.password if user else None, password):
                 flash("Incorrect email or password", category="error")
                 return redirect("/admin/login", 302)
 
             session["user"] = {"id": user.id, "permission": user.roles.value}
+            session.permanent = True
             return redirect("/admin", 302)
         return self.render("admin/login.html", form=form)
 
@@ -112,6 +114,35 @@ class SignalModelView(ModelView):
     )
     form_columns = ("signal", "status", "user", "short_text", "date_created")
 
+    def on_model_change(self, form, model, is_created):
+        if is_created:
+            return
+        # the stored row, before the form's changes are flushed
+        with db.session.no_autoflush:
+            previous_provider = db.session.execute(
+                db.select(Signal.provider).filter_by(id=model.id)
+            ).scalar_one()
+        provider = model.user.id
+        if previous_provider == provider:
+            return
+        rating_sum, rated_count, unrated_count = ProviderRating.signal_totals(model.id)
+        ProviderRating.record(
+            previous_provider,
+            rating_sum=-rating_sum,
+            rated_count=-rated_count,
+            unrated_count=-unrated_count,
+        )
+        ProviderRating.record(provider, rating_sum, rated_count, unrated_count)
+
+    def on_model_delete(self, model):
+        rating_sum, rated_count, unrated_count = ProviderRating.signal_totals(model.id)
+        ProviderRating.record(
+            model.provider,
+            rating_sum=-rating_sum,
+            rated_count=-rated_count,
+            unrated_count=-unrated_count,
+        )
+
 
 class ProviderApplicationView(ModelView):
     def is_accessible(self):
@@ -167,6 +198,35 @@ class PlacedSignalsModelView(ModelView):
     )
     form_columns = ("user", "signal_id", "rating", "date_created")
 
+    def on_model_change(self, form, model, is_created):
+        if is_created:
+            ProviderRating.record_placed_signal(
+                db.session.get(Signal, model.signal_id).provider, model.rating
+            )
+            return
+        # the stored row, before the form's changes are flushed
+        with db.session.no_autoflush:
+            previous_signal_id, previous_rating = db.session.execute(
+                db.select(PlacedSignals.signal_id, PlacedSignals.rating).filter_by(
+                    id=model.id
+                )
+            ).one()
+        if (previous_signal_id, previous_rating) == (model.signal_id, model.rating):
+            return
+        ProviderRating.record_placed_signal(
+            db.session.get(Signal, previous_signal_id).provider,
+            previous_rating,
+            count=-1,
+        )
+        ProviderRating.record_placed_signal(
+            db.session.get(Signal, model.signal_id).provider, model.rating
+        )
+
+    def on_model_delete(self, model):
+        ProviderRating.record_placed_signal(
+            model.signal.provider, model.rating, count=-1
+        )
+
 
 class NotificationsModelView(ModelView):
     def is_accessible(self):
@@ -189,6 +249,23 @@ class NotificationsModelView(ModelView):
     )
     form_columns = ("user", "message", "date_created")
 
+    def on_model_change(self, form, model, is_created):
+        if not is_created:
+            # the stored row, before the form's changes are flushed
+            with db.session.no_autoflush:
+                previous = db.session.execute(
+                    db.select(
+                        Notification.user_id, Notification.date_created
+                    ).filter_by(id=model.id)
+                ).one()
+            if tuple(previous) == (model.user.id, model.date_created):
+                return
+            Notification.record_unread(*previous, count=-1)
+        Notification.record_unread(model.user.id, model.date_created)
+
+    def on_model_delete(self, model):
+        Notification.record_unread(model.user_id, model.date_created, count=-1)
+
 
 # admin.add_view(AdminLoginView(endpoint="login", name="login"))
 # admin.add_view(AdminLogoutView(endpoint="logout", name="logout"))
@@ -0,0 +1,62 @@
+from MySignalsApp.models.base import BaseModel
+from MySignalsApp import db
+
+
+class Compensation(BaseModel):
+    """A CompensateProvider event indexed from the signals contract"""
+
+    __tablename__ = "compensations"
+    __table_args__ = (
+        db.UniqueConstraint("tx_hash", "log_index", name="_unique_tx_log"),
+    )
+
+    id = db.Column(db.Integer(), primary_key=True, unique=True, nullable=False)
+    tx_hash = db.Column(db.String(66), nullable=False, index=True)
+    log_index = db.Column(db.Integer(), nullable=False)
+    block_number = db.Column(db.BigInteger(), nullable=False)
+    contract = db.Column(db.String(43), nullable=False)
+    provider = db.Column(db.String(43), nullable=False)
+    referrer = db.Column(db.String(43), nullable=False)
+    amount = db.Column(db.Numeric(78, 0), nullable=False)
+    signal_id = db.Column(db.Integer(), nullable=False)
+    user_id = db.Column(db.String(34), nullable=False)
+
+    def __init__(
+        self,
+        tx_hash,
+        log_index,
+        block_number,
+        contract,
+        provider,
+        referrer,
+        amount,
+        signal_id,
+        user_id,
+    ):
+        self.tx_hash = tx_hash
+        self.log_index = log_index
+        self.block_number = block_number
+        self.contract = contract
+        self.provider = provider
+        self.referrer = referrer
+        self.amount = amount
+        self.signal_id = signal_id
+        self.user_id = user_id
+
+    def __repr__(self):
+        return f"id({self.id}), tx_hash({self.tx_hash}), log_index({self.log_index}), block_number({self.block_number}), provider({self.provider}), signal_id({self.signal_id}), user_id({self.user_id})) \n"
+
+    def format(self):
+        return {
+            "id": self.id,
+            "tx_hash": self.tx_hash,
+            "log_index": self.log_index,
+            "block_number": self.block_number,
+            "contract": self.contract,
+            "provider": self.provider,
+            "referrer": self.referrer,
+            "amount": str(self.amount),
+            "signal_id": self.signal_id,
+            "user_id": self.user_id,
+            "date_created": self.date_created,
+        }
@@ -0,0 +1,29 @@
+from MySignalsApp.models.base import BaseModel
+from MySignalsApp import db
+
+
+class IndexerCheckpoint(BaseModel):
+    """Last block an on-chain indexer has fully processed"""
+
+    __tablename__ = "indexercheckpoints"
+
+    id = db.Column(db.Integer(), primary_key=True, unique=True, nullable=False)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+    block_number = db.Column(db.BigInteger(), nullable=False)
+
+    def __init__(self, name, block_number):
+        self.name = name
+        self.block_number = block_number
+
+    def __repr__(self):
+        return (
+            f"id({self.id}), name({self.name}), block_number({self.block_number})) \n"
+        )
+
+    def format(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "block_number": self.block_number,
+            "date_created": self.date_created,
+        }
@@ -1,14 +1,21 @@
 from MySignalsApp.models.base import BaseModel
-from MySignalsApp import db
+from MySignalsApp import db, event_broker
+from sqlalchemy import event
+from collections import Counter
+
+PENDING_NOTIFICATIONS = "pending_notifications"
 
 
 class Notification(BaseModel):
     __tablename__ = "notifications"
+    __table_args__ = (
+        db.Index(
+            "ix_notifications_user_id_date_created", "user_id", "date_created", "id"
+        ),
+    )
 
     id = db.Column(db.Integer(), primary_key=True, unique=True, nullable=False)
-    user_id = db.Column(
-        db.String(34), db.ForeignKey("users.id"), index=True, nullable=False
-    )
+    user_id = db.Column(db.String(34), db.ForeignKey("users.id"), nullable=False)
     message = db.Column(db.String(210), nullable=False)
 
     def __init__(self, user_id, message):
@@ -21,6 +28,46 @@ class Notification(BaseModel):
     def __str__(self):
         return f"{self.message}"
 
+    @staticmethod
+    def notify(user_id, message):
+        Notification.notify_many([(user_id, message)])
+
+    @staticmethod
+    def notify_many(notifications):
+        """
+        Queue notifications on the current unit of work.
+
+        They are written with a single multi-row INSERT when the session
+        commits and discarded if it rolls back, the caller is responsible
+        for committing.
+
+        :param notifications: iterable of (user_id, message)
+        """
+        db.session.info.setdefault(PENDING_NOTIFICATIONS, []).extend(
+            {"user_id": user_id, "message": message}
+            for user_id, message in notifications
+        )
+
+    @staticmethod
+    def record_unread(user_id, date_created, count=1):
+        """
+        Add count to the user's unread counter if a notification created at
+        date_created is newer than their last read, the caller is responsible
+        for committing.
+        """
+        users = db.metadata.tables["users"]
+        db.session.execute(
+            users.update()
+            .where(
+                users.c.id == user_id,
+                db.or_(
+                    users.c.last_notification_read_time.is_(None),
+                    users.c.last_notification_read_time < date_created,
+                ),
+            )
+            .values(unread_notifications=users.c.unread_notifications + count)
+        )
+
     def format(self):
         return {
             "id": self.id,
@@ -28,3 +75,41 @@ class Notification(BaseModel):
             "user": self.user.user_name,
             "date_created": self.date_created,
         }
+
+
+@event.listens_for(db.session, "before_commit")
+def flush_notifications(session):
+    pending = session.info.pop(PENDING_NOTIFICATIONS, None)
+    if not pending:
+        return
+    from MySignalsApp.models.users import User
+
+    notifications = session.scalars(
+        db.insert(Notification).returning(Notification), pending
+    ).all()
+    unread = Counter(notification.user_id for notification in notifications)
+    # loads the recipients in one query, format() then finds them in the session
+    session.scalars(db.select(User).filter(User.id.in_(unread))).all()
+    for notification in notifications:
+        event_broker.publish_after_commit(
+            f"user:{notification.user_id}", "notification", notification.format()
+        )
+
+    users = db.metadata.tables["users"]
+    # increment in SQL and in a fixed order, so concurrent commits neither
+    # overwrite each other's counts nor deadlock on the user rows
+    session.execute(
+        users.update()
+        .where(users.c.id == db.bindparam("uid"))
+        .values(
+            unread_notifications=users.c.unread_notifications + db.bindparam("unread")
+        ),
+        [{"uid": user_id, "unread": unread[user_id]} for user_id in sorted(unread)],
+    )
+
+
+@event.listens_for(db.session, "after_transaction_end")
+def discard_notifications(session, transaction):
+    # a savepoint ending doesn't end the unit of work the notifications belong to
+    if transaction.parent is None:
+        session.info.pop(PENDING_NOTIFICATIONS, None)
@@ -0,0 +1,48 @@
+from sqlalchemy.dialects.postgresql import JSON
+from MySignalsApp.models.base import BaseModel
+from MySignalsApp import db
+
+
+class PendingOrder(BaseModel):
+    """Stop/take profit orders of a trade that aren't all on Binance yet"""
+
+    __tablename__ = "pendingorders"
+
+    id = db.Column(db.Integer(), primary_key=True, unique=True, nullable=False)
+    tracking_id = db.Column(db.String(40), unique=True, nullable=False)
+    user_id = db.Column(db.String(34), db.ForeignKey("users.id"), nullable=False)
+    market = db.Column(db.String(8), nullable=False)
+    symbol = db.Column(db.String(20), nullable=False)
+    # [client method name, params] of every order, placed in list order
+    orders = db.Column(JSON, nullable=False)
+    placed = db.Column(db.Integer(), nullable=False, default=0)
+    success_message = db.Column(db.String(210), nullable=False)
+    attempts = db.Column(db.Integer(), nullable=False, default=0)
+    attempted_at = db.Column(db.DateTime(), nullable=True, index=True)
+
+    def __init__(self, tracking_id, user_id, market, symbol, orders, success_message):
+        self.tracking_id = tracking_id
+        self.user_id = user_id
+        self.market = market
+        self.symbol = symbol
+        self.orders = orders
+        self.success_message = success_message
+        self.placed = 0
+        self.attempts = 0
+
+    def __repr__(self):
+        return f"id({self.id}), tracking_id({self.tracking_id}), user_id({self.user_id}), market({self.market}), symbol({self.symbol}), placed({self.placed}/{len(self.orders)}), attempts({self.attempts})) \n"
+
+    def format(self):
+        return {
+            "id": self.id,
+            "tracking_id": self.tracking_id,
+            "user_id": self.user_id,
+            "market": self.market,
+            "symbol": self.symbol,
+            "placed": self.placed,
+            "orders": len(self.orders),
+            "attempts": self.attempts,
+            "attempted_at": self.attempted_at,
+            "date_created": self.date_created,
+        }
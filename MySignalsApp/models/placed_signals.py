@@ -4,6 +4,13 @@ from MySignalsApp import db
 
 class PlacedSignals(BaseModel):
     __tablename__ = "placedsignals"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "signal_id", name="_unique_user_signal_pair"),
+        db.Index(
+            "ix_placedsignals_user_id_date_created", "user_id", "date_created", "id"
+        ),
+        db.Index("ix_placedsignals_signal_id", "signal_id"),
+    )
     id = db.Column(db.Integer(), primary_key=True, unique=True, nullable=False)
     user_id = db.Column(db.String(34), db.ForeignKey("users.id"), nullable=True)
     signal_id = db.Column(db.Integer(), db.ForeignKey("signals.id"), nullable=False)
@@ -12,8 +19,6 @@ class PlacedSignals(BaseModel):
     is_cancelled = db.Column(db.Boolean(), nullable=False, default=False)
     rating = db.Column(db.Integer(), nullable=False, default=0)
 
-    db.UniqueConstraint(user_id, signal_id, name="_unique_user_signal_pair")
-
     def __init__(self, user_id, signal_id, tx_hash):
         self.user_id = user_id
         self.signal_id = signal_id
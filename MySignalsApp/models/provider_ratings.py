@@ -0,0 +1,99 @@
+from MySignalsApp.models.base import BaseModel
+from MySignalsApp.models.placed_signals import PlacedSignals
+from MySignalsApp import db
+from sqlalchemy.exc import IntegrityError
+
+
+class ProviderRating(BaseModel):
+    """Running totals of the ratings placed on a provider's signals"""
+
+    __tablename__ = "providerratings"
+
+    id = db.Column(db.Integer(), primary_key=True, unique=True, nullable=False)
+    provider_id = db.Column(
+        db.String(34), db.ForeignKey("users.id"), unique=True, nullable=False
+    )
+    rating_sum = db.Column(db.Integer(), nullable=False, default=0)
+    rated_count = db.Column(db.Integer(), nullable=False, default=0)
+    unrated_count = db.Column(db.Integer(), nullable=False, default=0)
+
+    def __init__(self, provider_id, rating_sum=0, rated_count=0, unrated_count=0):
+        self.provider_id = provider_id
+        self.rating_sum = rating_sum
+        self.rated_count = rated_count
+        self.unrated_count = unrated_count
+
+    def __repr__(self):
+        return f"id({self.id}), provider_id({self.provider_id}), rating_sum({self.rating_sum}), rated_count({self.rated_count}), unrated_count({self.unrated_count})) \n"
+
+    @staticmethod
+    def average(rating_sum, rated_count, unrated_count):
+        """Average rating of a provider, unrated placed signals count as 0"""
+        total = rated_count + unrated_count
+        return round(rating_sum / total, 2) if total else 0
+
+    @staticmethod
+    def record(provider_id, rating_sum=0, rated_count=0, unrated_count=0):
+        """
+        Add the given deltas to a provider's aggregate in the current transaction.
+
+        The increment is done in SQL so concurrent requests can't overwrite
+        each other, the caller is responsible for committing.
+        """
+        values = dict(
+            rating_sum=ProviderRating.rating_sum + rating_sum,
+            rated_count=ProviderRating.rated_count + rated_count,
+            unrated_count=ProviderRating.unrated_count + unrated_count,
+        )
+        stmt = (
+            db.update(ProviderRating)
+            .where(ProviderRating.provider_id == provider_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.execute(stmt).rowcount:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.add(
+                    ProviderRating(provider_id, rating_sum, rated_count, unrated_count)
+                )
+        except IntegrityError:
+            # another request created the row first, add on top of it
+            db.session.execute(stmt)
+
+    @staticmethod
+    def record_placed_signal(provider_id, rating, count=1):
+        """Add count placed signals rated rating, 0 if unrated, to a provider's aggregate"""
+        rating = rating or 0
+        ProviderRating.record(
+            provider_id,
+            rating_sum=count * rating,
+            rated_count=count if rating else 0,
+            unrated_count=0 if rating else count,
+        )
+
+    @staticmethod
+    def signal_totals(signal_id):
+        """:return: (rating_sum, rated_count, unrated_count) of a signal's placed signals"""
+        return tuple(
+            db.session.execute(
+                db.select(
+                    db.func.coalesce(db.func.sum(PlacedSignals.rating), 0),
+                    db.func.count(PlacedSignals.id).filter(PlacedSignals.rating > 0),
+                    db.func.count(PlacedSignals.id).filter(PlacedSignals.rating == 0),
+                ).filter(PlacedSignals.signal_id == signal_id)
+            ).one()
+        )
+
+    def format(self):
+        return {
+            "id": self.id,
+            "provider_id": self.provider_id,
+            "rating": self.average(
+                self.rating_sum, self.rated_count, self.unrated_count
+            ),
+            "rated_count": self.rated_count,
+            "unrated_count": self.unrated_count,
+            "date_created": self.date_created,
+        }
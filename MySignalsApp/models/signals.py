@@ -5,6 +5,10 @@ from MySignalsApp import db
 
 class Signal(BaseModel):
     __tablename__ = "signals"
+    __table_args__ = (
+        db.Index("ix_signals_status_date_created", "status", "date_created", "id"),
+        db.Index("ix_signals_provider_date_created", "provider", "date_created", "id"),
+    )
 
     id = db.Column(db.Integer(), primary_key=True, unique=True, nullable=False)
     signal = db.Column(JSON, nullable=False)
@@ -40,3 +44,15 @@ class Signal(BaseModel):
             "short_text": self.short_text,
             "date_created": self.date_created,
         }
+
+    def format_preview(self):
+        """Signal as listed before purchase, without its prices and stops"""
+        return {
+            **self.format(),
+            "signal": {
+                "symbol": self.signal.get("symbol"),
+                "side": self.signal.get("side"),
+                "quantity": self.signal.get("quantity"),
+            },
+            "short_text": None,
+        }
@@ -10,11 +10,14 @@ class UserTokens(db.Model):
     __tablename__ = "usertokens"
 
     id = db.Column(db.Integer(), primary_key=True, unique=True, nullable=False)
-    user_id = db.Column(db.String(), db.ForeignKey("users.id"), nullable=False)
+    user_id = db.Column(
+        db.String(), db.ForeignKey("users.id"), nullable=False, index=True
+    )
     token = db.Column(db.String(), nullable=False, unique=True)
     expiration = db.Column(
         db.DateTime(timezone=True),
         nullable=False,
+        index=True,
         default=lambda: datetime.now(tz=timezone.utc) + timedelta(hours=2),
     )
 
@@ -1,13 +1,22 @@
 from MySignalsApp import db
 from MySignalsApp.models.base import BaseModel
 from MySignalsApp.models.notifications import Notification
-from MySignalsApp.utils import query_one_filtered
+from MySignalsApp.referral_codes import referral_codes
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
-from random import choices
-from uuid import uuid4
 import enum
 
 
+REFERRAL_CODE_ATTEMPTS = 3
+
+
+def referral_code_taken(error):
+    """Whether an IntegrityError is a violation of the referral_code unique constraint"""
+    # psycopg2 names the violated constraint, sqlite only mentions it in the message
+    constraint = getattr(getattr(error.orig, "diag", None), "constraint_name", None)
+    return "referral_code" in (constraint or str(error.orig))
+
+
 class Roles(enum.Enum):
     USER = "User"
     PROVIDER = ("User", "Provider")
@@ -20,6 +29,10 @@ class Roles(enum.Enum):
 
 class User(BaseModel):
     __tablename__ = "users"
+    __table_args__ = (
+        db.Index("ix_users_roles_date_created", "roles", "date_created"),
+        db.Index("ix_users_date_created", "date_created"),
+    )
 
     user_name = db.Column(db.String(345), unique=True, nullable=False, index=True)
     email = db.Column(db.String(345), unique=True, nullable=False, index=True)
@@ -30,6 +43,7 @@ class User(BaseModel):
     is_active = db.Column(db.Boolean(), nullable=False, default=False)
     roles = db.Column(db.Enum(Roles), nullable=False, default=Roles.USER)
     last_notification_read_time = db.Column(db.DateTime(), nullable=True)
+    unread_notifications = db.Column(db.Integer(), nullable=False, default=0)
     referral_code = db.Column(
         db.String(8), unique=True, nullable=True
     )  # TODO:make non nullable
@@ -75,21 +89,39 @@ class User(BaseModel):
         return f"{self.email}"
 
     def set_referral_code(self):
-        uuid = "".join(choices(uuid4().hex, k=8))
-        while query_one_filtered(User, referral_code=uuid):
-            uuid = "".join(choices(uuid4().hex, k=8))
-        self.referral_code = uuid
+        self.referral_code = referral_codes.next_code()
+
+    def insert(self):
+        """
+        Insert the user, with a new referral code if its code is already taken.
+
+        Each attempt runs in a savepoint, so a retry keeps the rest of the
+        session, any other constraint violation is raised at once.
+        """
+        for attempt in range(REFERRAL_CODE_ATTEMPTS):
+            try:
+                with db.session.begin_nested():
+                    db.session.add(self)
+                break
+            except IntegrityError as e:
+                if attempt == REFERRAL_CODE_ATTEMPTS - 1 or not referral_code_taken(e):
+                    raise
+                self.set_referral_code()
+        db.session.commit()
 
     def get_unread_notifications_count(self):
-        last_read_time = self.last_notification_read_time or datetime(1900, 1, 1)
-        query = db.select(Notification).where(
-            Notification.user_id == self.id,
-            Notification.date_created > last_read_time,
-        )
+        return self.unread_notifications
 
-        return db.session.scalar(
-            db.select(db.func.count()).select_from(query.subquery())
+    def mark_notifications_read(self):
+        """Reset the unread counter in SQL, so notifications committed meanwhile aren't lost"""
+        db.session.execute(
+            db.update(User)
+            .where(User.id == self.id)
+            .values(
+                unread_notifications=0, last_notification_read_time=datetime.utcnow()
+            )
         )
+        db.session.commit()
 
     def format(self):
         return {
@@ -0,0 +1,271 @@
+from MySignalsApp.models.notifications import Notification
+from MySignalsApp.models.pending_orders import PendingOrder
+from MySignalsApp.models.users import User
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from binance.error import ClientError
+from flask import current_app
+from MySignalsApp import cache, db, binance_clients, api_credentials
+from threading import Lock
+from time import monotonic, sleep
+
+
+ACCEPTED_ORDER_STATUSES = {"NEW", "PARTIALLY_FILLED", "FILLED"}
+CLOSED_ORDER_STATUSES = {"CANCELED", "REJECTED", "EXPIRED", "EXPIRED_IN_MATCH"}
+UNKNOWN_ORDER = -2013  # binance error code for "Order does not exist"
+UNKNOWN_ORDER_LIST = -2011  # returned for order lists, e.g. OCO, it doesn't know
+UNKNOWN_ORDER_CODES = {UNKNOWN_ORDER, UNKNOWN_ORDER_LIST}
+TRACKING_TIMEOUT = 86400  # 1 day
+
+_executor = None
+_executor_lock = Lock()
+
+
+class OrderPipelineError(Exception):
+    def __init__(self, message):
+        self.message = message
+
+
+def get_executor(app):
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config["ORDER_PIPELINE_WORKERS"],
+                thread_name_prefix="order-pipeline",
+            )
+    return _executor
+
+
+def tracking_key(tracking_id):
+    return f"order_pipeline_{tracking_id}"
+
+
+def set_tracking_status(tracking_id, user_id, status, message=None):
+    cache.set(
+        tracking_key(tracking_id),
+        {"user_id": user_id, "status": status, "message": message},
+        timeout=TRACKING_TIMEOUT,
+    )
+
+
+def get_tracking_status(tracking_id):
+    return cache.get(tracking_key(tracking_id))
+
+
+def wait_for_order(get_order, symbol, client_order_id, timeout):
+    """
+    Poll an order with exponential backoff until the exchange has accepted it.
+
+    :param get_order: client method querying an order, e.g. Spot.get_order
+    :return: the order
+    """
+    delay, deadline = 0.25, monotonic() + timeout
+    while True:
+        try:
+            order = get_order(symbol=symbol, origClientOrderId=client_order_id)
+            if order["status"] in ACCEPTED_ORDER_STATUSES:
+                return order
+            if order["status"] in CLOSED_ORDER_STATUSES:
+                raise OrderPipelineError(f"Entry order was {order['status'].lower()}")
+        except ClientError as e:
+            if e.error_code != UNKNOWN_ORDER:
+                raise
+        if monotonic() + delay > deadline:
+            raise OrderPipelineError("Entry order was not confirmed in time")
+        sleep(delay)
+        delay = min(delay * 2, 4)
+
+
+def leg_client_order_id(tracking_id, index):
+    """Client order id of a trade's index-th protective order"""
+    return f"{tracking_id}-{index}"
+
+
+def find_spot_leg(client, symbol, client_order_id):
+    return client.get_oco_order(origClientOrderId=client_order_id)
+
+
+def find_futures_leg(client, symbol, client_order_id):
+    return client.query_order(symbol=symbol, origClientOrderId=client_order_id)
+
+
+# per market: (client order id param of a protective order, entry order lookup,
+# protective order lookup)
+MARKETS = {
+    "spot": ("listClientOrderId", "get_order", find_spot_leg),
+    "futures": ("newClientOrderId", "query_order", find_futures_leg),
+}
+
+
+def place_protective_orders(
+    tracking_id, user_id, market, symbol, orders, success_message
+):
+    """
+    Place the stop/take profit orders of a trade once its entry order is confirmed.
+
+    The orders are saved as a PendingOrder before the request returns and
+    placed on the order pipeline executor, progress is kept under tracking_id
+    and the user is notified. A trade left pending by a crash or an
+    unexpected error is retried by the recover-orders command.
+
+    :param market: "spot" or "futures"
+    :param orders: list of (client method name, params) placed in order
+    :return: the future of the background run
+    """
+    id_param = MARKETS[market][0]
+    pending = PendingOrder(
+        tracking_id,
+        user_id,
+        market,
+        symbol,
+        [
+            [method, {**params, id_param: leg_client_order_id(tracking_id, index)}]
+            for index, (method, params) in enumerate(orders)
+        ],
+        success_message,
+    )
+    pending.attempted_at = datetime.utcnow()
+    pending.insert()
+    set_tracking_status(tracking_id, user_id, "pending")
+
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                process_pending_order(tracking_id)
+            except Exception:
+                # the trade stays pending for recover-orders to retry
+                app.logger.exception(f"Order pipeline {tracking_id} failed")
+                set_tracking_status(
+                    tracking_id,
+                    user_id,
+                    "pending",
+                    "Placing the stop orders is taking longer than usual",
+                )
+
+    return get_executor(app).submit(run)
+
+
+def process_pending_order(tracking_id, recovering=False):
+    """
+    Confirm the entry order of a pending trade, then place its remaining orders.
+
+    Each order is recorded as placed as soon as Binance accepts it, a retry
+    continues with the next one. When recovering, an order Binance already
+    has under its client order id isn't placed twice. Rejections end the
+    trade with a failure notification, any other error leaves it pending.
+
+    :return: True if the trade was settled, placed or failed for good
+    """
+    pending = db.session.execute(
+        db.select(PendingOrder).filter_by(tracking_id=tracking_id)
+    ).scalar_one_or_none()
+    if pending is None:
+        return True
+    user = db.session.get(User, pending.user_id)
+    client = getattr(binance_clients, pending.market)(*api_credentials.get(user))
+    id_param, get_order, find_leg = MARKETS[pending.market]
+    try:
+        wait_for_order(
+            getattr(client, get_order),
+            pending.symbol,
+            tracking_id,
+            current_app.config["ORDER_CONFIRM_TIMEOUT"],
+        )
+        for index in range(pending.placed, len(pending.orders)):
+            method, params = pending.orders[index]
+            if not (
+                recovering
+                and leg_exists(find_leg, client, pending.symbol, params[id_param])
+            ):
+                getattr(client, method)(**params)
+            pending.placed = index + 1
+            db.session.commit()
+    except (ClientError, OrderPipelineError) as e:
+        message = e.error_message if isinstance(e, ClientError) else e.message
+        settle_pending_order(
+            pending,
+            "failed",
+            f"Stop orders of trade {tracking_id} were not placed: {message}",
+            message,
+        )
+    else:
+        settle_pending_order(pending, "placed", pending.success_message)
+    return True
+
+
+def leg_exists(find_leg, client, symbol, client_order_id):
+    try:
+        find_leg(client, symbol, client_order_id)
+    except ClientError as e:
+        if e.error_code not in UNKNOWN_ORDER_CODES:
+            raise
+        return False
+    return True
+
+
+def settle_pending_order(pending, status, notification, message=None):
+    set_tracking_status(pending.tracking_id, pending.user_id, status, message)
+    Notification.notify(pending.user_id, notification[:210])
+    db.session.delete(pending)
+    db.session.commit()
+
+
+def recover_pending_orders(min_age, max_attempts):
+    """
+    Retry the trades whose protective orders were left pending for min_age seconds.
+
+    A trade failing max_attempts times is given up, the user is told to
+    place its stop orders themselves.
+
+    :return: (recovered, given_up, still pending) counts
+    """
+    recovered, given_up, retrying = 0, 0, 0
+    stale = datetime.utcnow() - timedelta(seconds=min_age)
+    tracking_ids = (
+        db.session.execute(
+            db.select(PendingOrder.tracking_id)
+            .filter(PendingOrder.attempted_at <= stale)
+            .order_by(PendingOrder.attempted_at)
+        )
+        .scalars()
+        .all()
+    )
+    for tracking_id in tracking_ids:
+        # claim the trade so another recovery run started meanwhile skips it
+        claimed = db.session.execute(
+            db.update(PendingOrder)
+            .where(
+                PendingOrder.tracking_id == tracking_id,
+                PendingOrder.attempted_at <= stale,
+            )
+            .values(attempts=PendingOrder.attempts + 1, attempted_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            continue
+        try:
+            process_pending_order(tracking_id, recovering=True)
+            recovered += 1
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception(f"Order recovery {tracking_id} failed")
+            pending = db.session.execute(
+                db.select(PendingOrder).filter_by(tracking_id=tracking_id)
+            ).scalar_one_or_none()
+            if pending is not None and pending.attempts >= max_attempts:
+                settle_pending_order(
+                    pending,
+                    "failed",
+                    f"Stop orders of trade {tracking_id} could not be placed, "
+                    "please place them on Binance yourself",
+                    "It's not you it's us",
+                )
+                given_up += 1
+            else:
+                retrying += 1
+    return recovered, given_up, retrying
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from statistics import median
+from time import perf_counter
+import os
+
+
+class PasswordHasher:
+    """
+    Runs Flask-Bcrypt hashing and verification on a bounded worker pool.
+
+    bcrypt releases the GIL, so at most BCRYPT_WORKERS hashes run at once per
+    process whatever the number of concurrent logins, leaving CPU to the
+    request threads serving everything else. Another BCRYPT_QUEUE_SIZE calls
+    may wait for a worker, for up to BCRYPT_QUEUE_TIMEOUT seconds, anything
+    beyond that is refused with a 503 instead of piling up.
+
+    Passwords are hashed at BCRYPT_LOG_ROUNDS, which every process reads from
+    the config rather than measuring, pick it with flask calibrate-bcrypt.
+    Logins rehash passwords stored at another cost, so raising or lowering it
+    needs no password reset.
+    """
+
+    def __init__(self, bcrypt, app=None):
+        self.bcrypt = bcrypt
+        self.workers = 2
+        self.queue_size = 16
+        self.queue_timeout = 5
+        self.rounds = 12
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._dummy_hash = None
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = app.config["BCRYPT_WORKERS"]
+        self.queue_size = app.config["BCRYPT_QUEUE_SIZE"]
+        self.queue_timeout = app.config["BCRYPT_QUEUE_TIMEOUT"]
+        self.rounds = app.config["BCRYPT_LOG_ROUNDS"]
+        self._dummy_hash = None
+
+    def check(self, pw_hash, password):
+        """
+        Verify password against pw_hash, or against a dummy hash if pw_hash
+        is None so unknown users take as long to reject as wrong passwords.
+        """
+        if pw_hash is None:
+            self._run(self._check_dummy, password)
+            return False
+        return self._run(self.bcrypt.check_password_hash, pw_hash, password)
+
+    def generate(self, password):
+        """:return: the bcrypt hash of password, as a string"""
+        return self._run(self._generate, password)
+
+    def rehash(self, pw_hash, password):
+        """
+        Hash a verified password again if pw_hash wasn't made at the current cost.
+
+        Skipped when the pool is saturated, the next login retries.
+
+        :return: the new hash, None if pw_hash is current or the pool is busy
+        """
+        if self.cost(pw_hash) == self.rounds:
+            return None
+        return self._run(self._generate, password, wait=False)
+
+    @staticmethod
+    def cost(pw_hash):
+        """:return: the log rounds a bcrypt hash was made with"""
+        return int(pw_hash.split("$")[2])
+
+    def measure(self, rounds, samples=3):
+        """:return: median seconds to hash a password at rounds, on this thread"""
+        password = os.urandom(16).hex()
+        timings = []
+        for _ in range(samples):
+            start = perf_counter()
+            self.bcrypt.generate_password_hash(password, rounds)
+            timings.append(perf_counter() - start)
+        return median(timings)
+
+    def _generate(self, password):
+        return self.bcrypt.generate_password_hash(password, self.rounds).decode("utf-8")
+
+    def _check_dummy(self, password):
+        if self._dummy_hash is None:
+            self._dummy_hash = self._generate(os.urandom(16).hex())
+        return self.bcrypt.check_password_hash(self._dummy_hash, password)
+
+    def _run(self, func, *args, wait=True):
+        executor, slots = self._ensure_pool()
+        if not wait:
+            if not slots.acquire(blocking=False):
+                return None
+        elif not slots.acquire(timeout=self.queue_timeout):
+            # imported here, the handlers import the app package this is part of
+            from MySignalsApp.errors.handlers import UtilError
+
+            raise UtilError(
+                "Service unavailable", 503, "Too many requests, try again shortly"
+            )
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            slots.release()
+
+    def _ensure_pool(self):
+        # a forked worker inherits the attributes but not the threads
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="bcrypt"
+                )
+                self._slots = BoundedSemaphore(self.workers + self.queue_size)
+            return self._executor, self._slots
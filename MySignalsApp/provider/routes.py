@@ -5,37 +5,41 @@ from MySignalsApp.schemas import (
     IntQuerySchema,
     PageQuerySchema,
 )
-from flask import Blueprint, jsonify, request, session, current_app
+from flask import Blueprint, jsonify, request, current_app, g
 from MySignalsApp.web3_helpers import prepare_futures_trade, prepare_spot_trade
-from MySignalsApp.models.users import User
 from MySignalsApp.models.base import get_uuid
 from MySignalsApp.models.signals import Signal
 from MySignalsApp.models.notifications import Notification
-from binance.um_futures import UMFutures
+from MySignalsApp.models.provider_ratings import ProviderRating
 from binance.error import ClientError
-from binance.spot import Spot
-from MySignalsApp import cache
+from MySignalsApp import cache, db, binance_clients, event_broker
 from MySignalsApp.utils import (
-    query_paginate_filtered,
-    has_permission,
+    query_listing_filtered,
+    pagination_meta,
+    permission_required,
     query_one_filtered,
-    is_active,
     calculate_rating,
     send_tg_notification,
 )
-from binance.spot import Spot
 import os
 
 provider = Blueprint("provider", __name__, url_prefix="/provider")
 
 
 @provider.route("/signals")
+@permission_required("Provider")
 def get_signals():
-    user_id = has_permission(session, "Provider")
-    user = is_active(User, user_id)
-    page = PageQuerySchema(page=request.args.get("page", 1))
+    user = g.current_user
+    user_id = user.id
+    page = PageQuerySchema(
+        page=request.args.get("page", 1),
+        cursor=request.args.get("cursor"),
+        with_total=request.args.get("with_total", False),
+    )
     try:
-        signals = query_paginate_filtered(Signal, page.page, provider=user_id)
+        signals = query_listing_filtered(
+            Signal, page, options=[db.joinedload(Signal.user)], provider=user_id
+        )
 
         return (
             jsonify(
@@ -44,8 +48,7 @@ def get_signals():
                     "signals": [signal.format() for signal in signals]
                     if signals.items
                     else [],
-                    "total": signals.total,
-                    "pages": signals.pages,
+                    **pagination_meta(signals),
                     "provider_rating": calculate_rating(user_id),
                     "status": True,
                 }
@@ -67,12 +70,11 @@ def get_signals():
 
 
 @provider.route("/spot/pairs")
+@permission_required("Provider")
 @cache.cached(timeout=432000)  # 5 days
 def get_spot_pairs():
-    user_id = has_permission(session, "Provider")
-    user = is_active(User, user_id)
     try:
-        spot_client = Spot()
+        spot_client = binance_clients.spot()
 
         usdt_symbols = spot_client.exchange_info(permissions=["SPOT"])["symbols"]
 
@@ -107,12 +109,11 @@ def get_spot_pairs():
 
 
 @provider.route("/futures/pairs")
+@permission_required("Provider")
 @cache.cached(timeout=432000)  # 5 days
 def get_futures_pairs():
-    user_id = has_permission(session, "Provider")
-    user = is_active(User, user_id)
     try:
-        futures_client = UMFutures()
+        futures_client = binance_clients.futures()
         usdt_symbols = futures_client.exchange_info()["symbols"]
         if not usdt_symbols:
             return jsonify({"message": "success", "pairs": [], "status": True}), 200
@@ -148,19 +149,18 @@ def get_futures_pairs():
 
 
 @provider.route("/update_wallet", methods=["POST"])
+@permission_required("Provider")
 def change_wallet():
-    user_id = has_permission(session, "Provider")
+    user = g.current_user
     data = request.get_json()
 
-    user = is_active(User, user_id)
     data = WalletSchema(**data)
     try:
         user.wallet = data.wallet
-        user.update()
-        notify = Notification(
+        Notification.notify(
             user.id, f"Your Wallet Address was Successfully Changed to {user.wallet}"
         )
-        notify.insert()
+        user.update()
         return jsonify({"message": "Wallet changed", "status": True}), 200
     except Exception as e:
         current_app.log_exception(exc_info=e)
@@ -180,7 +180,7 @@ def change_wallet():
 @provider.route("/time")
 def get_time():
     try:
-        return Spot().ping()
+        return binance_clients.spot().ping()
     except ClientError as e:
         return (
             jsonify(
@@ -191,9 +191,10 @@ def get_time():
 
 
 @provider.route("/spot/new", methods=["POST"])
+@permission_required("Provider")
 def new_spot_trade():
-    user_id = has_permission(session, "Provider")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
 
     if not user.wallet:
         return (
@@ -218,10 +219,8 @@ def new_spot_trade():
         stops=dict(sl=data.sl, tp1=data.tp1, tp2=data.tp2, tp3=data.tp3),
     )
 
-    spot_client = Spot(
-        api_key=os.getenv("SKEY"),
-        api_secret=os.getenv("SSEC"),
-        base_url="https://testnet.binance.vision",
+    spot_client = binance_clients.spot(
+        os.getenv("SKEY"), os.getenv("SSEC"), base_url="https://testnet.binance.vision"
     )
     params, _, stop_params = prepare_spot_trade(
         signal_data, get_uuid(), data.tp1, data.quantity
@@ -235,6 +234,7 @@ def new_spot_trade():
     try:
         signal = Signal(signal_data, True, user_id, True, data.short_text)
         signal.insert()
+        event_broker.publish_event("signals", "signal", signal.format_preview())
         return (
             jsonify({"message": "success", "signal": signal.format(), "status": True}),
             200,
@@ -254,9 +254,10 @@ def new_spot_trade():
 
 
 @provider.route("/futures/new", methods=["POST"])
+@permission_required("Provider")
 def new_futures_trade():
-    user_id = has_permission(session, "Provider")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
 
     if not user.wallet:
         return (
@@ -282,9 +283,9 @@ def new_futures_trade():
         stops=dict(sl=data.sl, tp1=data.tp1, tp2=data.tp2, tp3=data.tp3),
     )
 
-    futures_client = UMFutures(
-        key=os.getenv("FKEY"),
-        secret=os.getenv("FSEC"),
+    futures_client = binance_clients.futures(
+        os.getenv("FKEY"),
+        os.getenv("FSEC"),
         base_url="https://testnet.binancefuture.com",
     )
     params, _, stop_params, tp_params = prepare_futures_trade(
@@ -300,6 +301,7 @@ def new_futures_trade():
     try:
         signal = Signal(signal_data, True, user_id, False, data.short_text)
         signal.insert()
+        event_broker.publish_event("signals", "signal", signal.format_preview())
         return (
             jsonify({"message": "success", "signal": signal.format(), "status": True}),
             200,
@@ -319,9 +321,10 @@ def new_futures_trade():
 
 
 @provider.route("/delete/<int:signal_id>", methods=["POST"])
+@permission_required("Provider")
 def delete_trade(signal_id):
-    user_id = has_permission(session, "Provider")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
     signal_id = IntQuerySchema(id=signal_id)
     try:
         signal = query_one_filtered(Signal, id=signal_id.id)
@@ -349,6 +352,13 @@ def delete_trade(signal_id):
                 403,
             )
 
+        rating_sum, rated_count, unrated_count = ProviderRating.signal_totals(signal.id)
+        ProviderRating.record(
+            signal.provider,
+            rating_sum=-rating_sum,
+            rated_count=-rated_count,
+            unrated_count=-unrated_count,
+        )
         signal.delete()
         return jsonify({"message": "success", "signal_id": signal.id, "status": True})
     except Exception as e:
@@ -366,9 +376,10 @@ def delete_trade(signal_id):
 
 
 @provider.route("/deactivate/<int:signal_id>", methods=["POST"])
+@permission_required("Provider")
 def deactivate_trade(signal_id):
-    user_id = has_permission(session, "Provider")
-    user = is_active(User, user_id)
+    user = g.current_user
+    user_id = user.id
     signal_id = IntQuerySchema(id=signal_id)
     try:
         signal = query_one_filtered(Signal, id=signal_id.id)
@@ -0,0 +1,59 @@
+from MySignalsApp import db
+from threading import Lock
+import secrets
+import os
+
+
+BLOCK_SIZE = 1000
+CODE_SPACE = 2**32  # 8 hex characters
+# odd, so multiplying by it modulo CODE_SPACE permutes the code space
+MULTIPLIER = 0x9E3779B1
+MASK = 0x5BD1E995
+
+# every nextval reserves the BLOCK_SIZE values starting at the returned one
+REFERRAL_CODE_SEQUENCE = db.Sequence(
+    "referral_code_seq", increment=BLOCK_SIZE, metadata=db.metadata
+)
+
+
+def encode(number):
+    """Map a sequence number to its 8 hex character code, distinct per number"""
+    return f"{(number * MULTIPLIER) % CODE_SPACE ^ MASK:08x}"
+
+
+class ReferralCodeAllocator:
+    """
+    Hands out referral codes without checking the users table.
+
+    Each process reserves a block of BLOCK_SIZE sequence numbers with one
+    nextval and encodes them in turn, so codes of different processes never
+    overlap. Databases without sequences get random blocks instead. Either
+    way the unique constraint on users.referral_code is the safety net, for
+    codes that were drawn at random before this existed.
+    """
+
+    def __init__(self):
+        self._next = 0
+        self._end = 0
+        self._pid = None
+        self._lock = Lock()
+
+    def next_code(self):
+        with self._lock:
+            # a forked worker must not hand out its parent's block
+            if self._next >= self._end or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next = self._allocate_block()
+                self._end = self._next + BLOCK_SIZE
+            number = self._next
+            self._next += 1
+        return encode(number)
+
+    @staticmethod
+    def _allocate_block():
+        if db.session.get_bind().dialect.supports_sequences:
+            return db.session.execute(REFERRAL_CODE_SEQUENCE.next_value()).scalar()
+        return secrets.randbelow(CODE_SPACE // BLOCK_SIZE) * BLOCK_SIZE
+
+
+referral_codes = ReferralCodeAllocator()
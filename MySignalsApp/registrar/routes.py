@@ -1,22 +1,22 @@
-from flask import Blueprint, request, jsonify, session, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from MySignalsApp.schemas import ValidEmailSchema, PageQuerySchema
 from MySignalsApp.models.users import User, Roles
 from MySignalsApp.models.notifications import Notification
+from MySignalsApp import mail_queue
 from MySignalsApp.utils import (
     query_one_filtered,
     query_paginate_filtered,
     query_paginated,
-    has_permission,
-    is_active,
+    permission_required,
 )
 
 registrar = Blueprint("registrar", __name__, url_prefix="/registrar")
 
 
 @registrar.route("/provider/new", methods=["POST"])
+@permission_required("Registrar")
 def add_provider():
-    registrar_id = has_permission(session, "Registrar")
-    is_active(User, registrar_id)
+    registrar_id = g.current_user.id
 
     data = request.get_json()
 
@@ -59,16 +59,16 @@ def add_provider():
             )
 
         user.roles = Roles.PROVIDER
-        user.update()
-        notify_provider = Notification(
-            user.id,
-            "Congratulations! you've been granted Signal Provider Authorization",
-        )
-        notify_registrar = Notification(
-            registrar_id, f"You made {user.email} a Signal Provider"
+        Notification.notify_many(
+            [
+                (
+                    user.id,
+                    "Congratulations! you've been granted Signal Provider Authorization",
+                ),
+                (registrar_id, f"You made {user.email} a Signal Provider"),
+            ]
         )
-        notify_provider.insert()
-        notify_registrar.insert()
+        user.update()
         return jsonify(
             {"message": "success", "provider": provider_email.email, "status": True}
         )
@@ -87,9 +87,9 @@ def add_provider():
 
 
 @registrar.route("/registrar/new", methods=["POST"])
+@permission_required("Registrar")
 def add_registrar():
-    registrar_id = has_permission(session, "Registrar")
-    is_active(User, registrar_id)
+    registrar_id = g.current_user.id
 
     data = request.get_json()
 
@@ -151,9 +151,9 @@ def add_registrar():
 
 
 @registrar.route("/drop_role", methods=["POST"])
+@permission_required("Registrar")
 def drop_role():
-    registrar_id = has_permission(session, "Registrar")
-    is_active(User, registrar_id)
+    registrar_id = g.current_user.id
 
     data = request.get_json()
 
@@ -196,15 +196,13 @@ def drop_role():
             )
 
         user.roles = Roles.USER
-        user.update()
-        notify_provider = Notification(
-            user.id, "Your Special Authorizations Have Been Revoked!"
+        Notification.notify_many(
+            [
+                (user.id, "Your Special Authorizations Have Been Revoked!"),
+                (registrar_id, f"{user.email} Authorizations have been revoked"),
+            ]
         )
-        notify_registrar = Notification(
-            registrar_id, f"{user.email} Authorizations have been revoked"
-        )
-        notify_provider.insert()
-        notify_registrar.insert()
+        user.update()
         return jsonify(
             {"message": "success", "registrar": user_email.email, "status": True}
         )
@@ -223,9 +221,8 @@ def drop_role():
 
 
 @registrar.route("/role/providers")
+@permission_required("Registrar")
 def get_providers():
-    registrar_id = has_permission(session, "Registrar")
-    is_active(User, registrar_id)
     page = PageQuerySchema(page=request.args.get("page", 1))
     try:
         providers = query_paginate_filtered(User, page.page, roles=Roles.PROVIDER)
@@ -265,9 +262,8 @@ def get_providers():
 
 
 @registrar.route("/role/registrars")
+@permission_required("Registrar")
 def get_registrars():
-    registrar_id = has_permission(session, "Registrar")
-    is_active(User, registrar_id)
     page = PageQuerySchema(page=request.args.get("page", 1))
     try:
         registrars = query_paginate_filtered(User, page.page, roles=Roles.REGISTRAR)
@@ -307,9 +303,8 @@ def get_registrars():
 
 
 @registrar.route("/role/users")
+@permission_required("Registrar")
 def get_users():
-    registrar_id = has_permission(session, "Registrar")
-    is_active(User, registrar_id)
     page = PageQuerySchema(page=request.args.get("page", 1))
     try:
         users = query_paginate_filtered(User, page.page, roles=Roles.USER)
@@ -349,9 +344,8 @@ def get_users():
 
 
 @registrar.route("/get/users")
+@permission_required("Registrar")
 def get_all_users():
-    registrar_id = has_permission(session, "Registrar")
-    is_active(User, registrar_id)
     page = PageQuerySchema(page=request.args.get("page", 1))
     try:
         users = query_paginated(User, page.page)
@@ -388,3 +382,9 @@ def get_all_users():
             ),
             500,
         )
+
+
+@registrar.route("/mail/stats")
+@permission_required("Registrar")
+def get_mail_stats():
+    return jsonify({"message": "success", "mail": mail_queue.stats(), "status": True})
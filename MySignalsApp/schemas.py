@@ -2,6 +2,7 @@ from pydantic import BaseModel, constr, EmailStr, validator, EmailError
 from email_validator import validate_email, EmailNotValidError, EmailUndeliverableError
 from uuid import UUID
 from web3 import Web3
+from MySignalsApp.utils import decode_cursor
 
 
 class RegisterSchema(BaseModel):
@@ -76,6 +77,14 @@ class RatingSchema(BaseModel):
 
 class PageQuerySchema(BaseModel):
     page: int
+    cursor: constr(max_length=128) | None = None
+    with_total: bool = False
+
+    @validator("cursor")
+    def valid_cursor(cls, v):
+        if v:
+            decode_cursor(v)
+        return v
 
 
 class WalletSchema(BaseModel):
@@ -0,0 +1,133 @@
+from telegram import Bot
+from telegram.constants import MessageLimit, ParseMode
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+from threading import Lock, Thread
+import asyncio
+import os
+
+
+class TelegramDispatcher:
+    """
+    Sends channel notifications from one long lived asyncio loop per process.
+
+    The loop runs in a daemon thread and owns a single Bot, so its HTTP
+    connection pool is reused across messages. Messages queued within
+    TELEGRAM_COALESCE_WINDOW are joined into as few messages as fit Telegram's
+    length limit, sends are spaced by TELEGRAM_MIN_INTERVAL and RetryAfter
+    responses are waited out. The queue is bounded, messages arriving while it
+    is full are dropped.
+    """
+
+    def __init__(self, app=None):
+        self.token = None
+        self.chat_id = None
+        self.base_url = None
+        self.queue_size = 100
+        self.coalesce_window = 2
+        self.min_interval = 3
+        self.max_retries = 3
+        self.logger = None
+        self._loop = None
+        self._queue = None
+        self._pid = None
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.token = os.getenv("TELEGRAM_KEY")
+        self.chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        self.base_url = app.config["TELEGRAM_BASE_URL"]
+        self.queue_size = app.config["TELEGRAM_QUEUE_SIZE"]
+        self.coalesce_window = app.config["TELEGRAM_COALESCE_WINDOW"]
+        self.min_interval = app.config["TELEGRAM_MIN_INTERVAL"]
+        self.logger = app.logger
+
+    def send(self, text):
+        """Queue a MarkdownV2 message for the channel, returns immediately"""
+        if not (self.token and self.chat_id):
+            self.logger.warning("Telegram is not configured, notification dropped")
+            return
+        self._ensure_loop().call_soon_threadsafe(self._put, text)
+
+    def _ensure_loop(self):
+        # a forked worker inherits the attributes but not the thread
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._loop = asyncio.new_event_loop()
+                self._queue = asyncio.Queue(self.queue_size)
+                Thread(
+                    target=self._loop.run_until_complete,
+                    args=(self._run(),),
+                    name="telegram-dispatcher",
+                    daemon=True,
+                ).start()
+            return self._loop
+
+    def _put(self, text):
+        try:
+            self._queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.logger.warning("Telegram queue is full, notification dropped")
+
+    async def _run(self):
+        while True:
+            try:
+                async with Bot(token=self.token, base_url=self.base_url) as bot:
+                    await self._dispatch(bot)
+            except Exception:
+                self.logger.exception("Telegram dispatcher failed, restarting")
+                await asyncio.sleep(self.min_interval)
+
+    async def _dispatch(self, bot):
+        while True:
+            texts = [await self._queue.get()]
+            await asyncio.sleep(self.coalesce_window)
+            while not self._queue.empty():
+                texts.append(self._queue.get_nowait())
+            for text in self.coalesce(texts):
+                await self._send(bot, text)
+                await asyncio.sleep(self.min_interval)
+
+    @staticmethod
+    def coalesce(texts, limit=MessageLimit.MAX_TEXT_LENGTH):
+        """Join consecutive messages as long as they fit in one Telegram message"""
+        messages = []
+        for text in texts:
+            if messages and len(messages[-1]) + 2 + len(text) <= limit:
+                messages[-1] = f"{messages[-1]}\n\n{text}"
+            else:
+                messages.append(text)
+        return messages
+
+    async def _send(self, bot, text):
+        attempts = 0
+        while True:
+            try:
+                await bot.send_message(
+                    chat_id=self.chat_id,
+                    text=text,
+                    parse_mode=ParseMode.MARKDOWN_V2,
+                )
+                return
+            except RetryAfter as e:
+                # rate limited, doesn't count as a failed attempt
+                retry_after = e.retry_after
+                await asyncio.sleep(
+                    retry_after.total_seconds()
+                    if hasattr(retry_after, "total_seconds")
+                    else retry_after
+                )
+            except BadRequest:
+                self.logger.exception("Telegram notification was rejected")
+                return
+            except NetworkError:
+                attempts += 1
+                if attempts > self.max_retries:
+                    self.logger.exception("Telegram notification failed")
+                    return
+                await asyncio.sleep(2**attempts)
+            except TelegramError:
+                self.logger.exception("Telegram notification failed")
+                return
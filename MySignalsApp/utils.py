@@ -1,16 +1,15 @@
 from MySignalsApp.errors.handlers import UtilError
 from MySignalsApp.models.base import get_uuid
-from MySignalsApp.models.signals import Signal
-from MySignalsApp.models.placed_signals import PlacedSignals
+from MySignalsApp.models.users import User
+from MySignalsApp.models.provider_ratings import ProviderRating
 from MySignalsApp.models.user_tokens import UserTokens
 from datetime import datetime, timezone
-from flask import current_app, url_for, render_template
-from MySignalsApp import db, mail, cache
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from flask import current_app, url_for, render_template, session, g
+from functools import wraps
+from MySignalsApp import db, mail_queue, tg_dispatcher
 from flask_mail import Message
-from threading import Thread
-from telegram import Bot
-from telegram.constants import ParseMode
-import asyncio
+import json
 import os
 
 
@@ -31,24 +30,111 @@ def query_all(table):
     return db.session.execute(db.select(table)).scalars().all()
 
 
-def query_paginated(table, page):
+def query_paginated(table, page, options=()):
     return db.paginate(
-        db.select(table).order_by(table.date_created.desc()),
+        db.select(table).options(*options).order_by(table.date_created.desc()),
         per_page=15,
         page=page,
         error_out=False,
     )
 
 
-def query_paginate_filtered(table, page, **kwargs):
+def query_paginate_filtered(table, page, options=(), **kwargs):
+    """
+    Paginate the rows of table matching kwargs, newest first.
+
+    :param options: loader options, e.g. db.joinedload(...), for the relationships
+        the caller formats so a page costs the same number of queries at any size
+    """
     return db.paginate(
-        db.select(table).filter_by(**kwargs).order_by(table.date_created.desc()),
+        db.select(table)
+        .options(*options)
+        .filter_by(**kwargs)
+        .order_by(table.date_created.desc()),
         per_page=15,
         page=page,
         error_out=False,
     )
 
 
+class KeysetPagination:
+    """A page of rows following a cursor, iterable like the result of db.paginate"""
+
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def encode_cursor(row):
+    position = json.dumps([row.date_created.isoformat(), row.id])
+    return urlsafe_b64encode(position.encode("utf-8")).decode("utf-8")
+
+
+def decode_cursor(cursor):
+    try:
+        date_created, id = json.loads(urlsafe_b64decode(cursor.encode("utf-8")))
+        return datetime.fromisoformat(date_created), int(id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def query_keyset_filtered(
+    table, cursor=None, with_total=False, options=(), per_page=15, **kwargs
+):
+    """
+    Fetch the rows of table matching kwargs that come after cursor, newest first.
+
+    Rows are ordered on (date_created, id) and located with a range condition
+    instead of an OFFSET, the total COUNT(*) only runs when with_total is set.
+
+    :param cursor: opaque next_cursor of the previous page, None for the first page
+    """
+    query = db.select(table).filter_by(**kwargs)
+    total = (
+        db.session.scalar(db.select(db.func.count()).select_from(query.subquery()))
+        if with_total
+        else None
+    )
+    if cursor:
+        query = query.filter(
+            db.tuple_(table.date_created, table.id) < decode_cursor(cursor)
+        )
+    items = (
+        db.session.execute(
+            query.options(*options)
+            .order_by(table.date_created.desc(), table.id.desc())
+            .limit(per_page + 1)
+        )
+        .scalars()
+        .all()
+    )
+    next_cursor = encode_cursor(items[per_page - 1]) if len(items) > per_page else None
+    return KeysetPagination(items[:per_page], next_cursor, total)
+
+
+def query_listing_filtered(table, page_query, options=(), **kwargs):
+    """Keyset pagination when the request sent a cursor, page numbers otherwise"""
+    if page_query.cursor is not None:
+        return query_keyset_filtered(
+            table,
+            page_query.cursor,
+            with_total=page_query.with_total,
+            options=options,
+            **kwargs,
+        )
+    return query_paginate_filtered(table, page_query.page, options=options, **kwargs)
+
+
+def pagination_meta(pagination):
+    if isinstance(pagination, KeysetPagination):
+        return {"next_cursor": pagination.next_cursor, "total": pagination.total}
+    return {"total": pagination.total, "pages": pagination.pages}
+
+
 # token helpers
 def get_reset_token(user):
     token = get_uuid()
@@ -62,12 +148,12 @@ def verify_reset_token(user_table, token):
         token_data = query_one_filtered(UserTokens, token=token)
         if not token_data:
             return None
-        user = query_one_filtered(user_table, id=token_data.user_id)
         if token_data.expiration >= datetime.now(timezone.utc):
+            user = query_one_filtered(user_table, id=token_data.user_id)
             token_data.delete()
             return user
 
-        token_data.delete() if user.is_active else user.delete()
+        # expired tokens and abandoned accounts are purged by `flask sweep-tokens`
         return None
     except Exception as e:
         current_app.log_exception(e)
@@ -81,33 +167,17 @@ def has_api_keys(user):
 
 
 # Notification Helpers
-def send_async_notify(bot, msg):
-    asyncio.run(
-        bot.send_message(
-            chat_id=os.getenv("TELEGRAM_CHAT_ID"),
-            text=msg,
-            parse_mode=ParseMode.MARKDOWN_V2,
-        )
-    )
-
-
 def send_tg_notification(provider, signal_type, side, symbol):
-    bot = Bot(token=os.getenv("TELEGRAM_KEY"))
     text = f"""📣🔔🔔🔔🔔🔔🔔🔔
 Signal Provider *{provider}* Just uploaded a *{signal_type}* *{side}* signal for *{symbol}*
 visit mysignals\.app/dashboard/signals to see it now\!\!
 💸💸💸💸💸"""
-    Thread(target=send_async_notify, args=(bot, text)).start()
+    tg_dispatcher.send(text)
 
 
 # Flask Mail helpers
 
 
-def send_async_mail(app, msg):
-    with app.app_context():
-        mail.send(msg)
-
-
 def send_email(user, url_func):
     token = get_reset_token(user)
     msg = Message(
@@ -121,9 +191,7 @@ def send_email(user, url_func):
         if url_func == "auth.activate_user"
         else f"https://{os.environ.get('FRONTEND', '/')}/reset_password/{token}",
     )
-    Thread(
-        target=send_async_mail, args=(current_app._get_current_object(), msg)
-    ).start()
+    mail_queue.send(msg)
     # mail.send(msg)
     # print(url_for(url_func, token=token, _external=True))
 
@@ -143,32 +211,80 @@ def has_permission(session, permission):
     return user.get("id")
 
 
-def is_active(table, user_id):
-    user = query_one_filtered(table, id=user_id)
+def load_current_user(*options):
+    """
+    Load the logged in user once per request and keep it on flask.g.
 
-    if not user:
-        raise UtilError("Resource not found", 404, "The User does not exist")
+    Later calls in the same request return the same instance without a query.
+
+    :param options: loader options for the relationships the endpoint needs,
+        e.g. db.joinedload(User.referrer), applied when the user is first loaded
+    :return: the user, None if not logged in or the user no longer exists
+    """
+    if "current_user" not in g:
+        user = session.get("user")
+        g.current_user = (
+            db.session.get(User, user.get("id"), options=options) if user else None
+        )
+    return g.current_user
+
+
+def permission_required(permission, *options):
+    """
+    Require a logged in, active user with permission, loaded onto g.current_user.
+
+    :param options: loader options passed to load_current_user
+    """
 
-    if not user.is_active:
-        raise UtilError("Unauthorized", 401, "Your account is not active")
-    return user
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            has_permission(session, permission)
+            user = load_current_user(*options)
+            if not user:
+                raise UtilError("Resource not found", 404, "The User does not exist")
+            if not user.is_active:
+                raise UtilError("Unauthorized", 401, "Your account is not active")
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
 
 
 # rating helpers
 
 
-@cache.memoize(timeout=43200)  # 43200 seconds = 0.5 days
-def calculate_rating(provider_id):
-    ratings = (
-        db.session.execute(
-            db.select(PlacedSignals.rating)
-            .join(PlacedSignals.signal)
-            .filter(Signal.provider == provider_id)
-        )
-        .scalars()
-        .all()
+def calculate_ratings(provider_ids):
+    """Resolve the average rating of several providers at once
+
+    Ratings are read from the per provider aggregates kept up to date by
+    ProviderRating.record, so this is a single indexed lookup.
+
+    :param provider_ids: iterable of provider (user) ids
+    :return: dict mapping each provider id to its rating
+    """
+    provider_ids = list(dict.fromkeys(provider_ids))
+    if not provider_ids:
+        return {}
+
+    rows = db.session.execute(
+        db.select(
+            ProviderRating.provider_id,
+            ProviderRating.rating_sum,
+            ProviderRating.rated_count,
+            ProviderRating.unrated_count,
+        ).filter(ProviderRating.provider_id.in_(provider_ids))
+    ).all()
+    ratings = dict.fromkeys(provider_ids, 0)
+    ratings.update(
+        {
+            provider_id: ProviderRating.average(*aggregate)
+            for provider_id, *aggregate in rows
+        }
     )
-    if not ratings:
-        return 0
-    rating_total = sum(ratings)
-    return round(rating_total / (len(ratings) if ratings else 1), 2)
+    return ratings
+
+
+def calculate_rating(provider_id):
+    return calculate_ratings([provider_id])[provider_id]
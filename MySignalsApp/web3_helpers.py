@@ -1,8 +1,17 @@
 from web3 import Web3
 from MySignalsApp.errors.handlers import UtilError
-from MySignalsApp import contract_address, abi, cache
+from MySignalsApp import cache, contract_address, abi
+from MySignalsApp.json_rpc import JsonRpcBatcher
+from MySignalsApp.exchange_info import (
+    MISSING,
+    get_precision,
+    load_precision_on_demand,
+)
+from flask import current_app
 from web3.datastructures import AttributeDict
-from web3.exceptions import TransactionNotFound
+from eth_utils import event_abi_to_log_topic
+from eth_abi.grammar import parse as parse_abi_type
+from hexbytes import HexBytes
 from web3.types import _Hash32, TxReceipt
 import os
 
@@ -11,30 +20,236 @@ w3 = Web3(Web3.HTTPProvider(provider))
 
 contract = w3.eth.contract(address=contract_address, abi=abi)
 
+rpc_batcher = JsonRpcBatcher(w3.provider)
 
-def is_transaction_confirmed(tx_hash: _Hash32) -> TxReceipt:
-    try:
-        tx_receipt = w3.eth.get_transaction_receipt(tx_hash)
-    except TransactionNotFound as e:
-        raise UtilError("Resource not found", 404, str(e))
-    if not (
-        tx_receipt.status and (w3.eth.get_block_number() - tx_receipt.blockNumber) >= 2
-    ):
-        raise UtilError("Forbidden", 403, "This was not a successful transaction")
-    return tx_receipt
+
+class EventDecoder:
+    """
+    Decoder of one contract event with its topic and ABI types resolved up front.
+
+    Produces the same event data as web3's process_log without re-deriving
+    the event ABI for every log.
+    """
+
+    __slots__ = (
+        "name",
+        "topic",
+        "indexed",
+        "data_names",
+        "data_types",
+        "address_names",
+    )
+
+    def __init__(self, event_abi: dict):
+        self.name = event_abi["name"]
+        self.topic = event_abi_to_log_topic(event_abi)
+        self.indexed = [
+            (arg["name"], arg["type"], parse_abi_type(arg["type"]).is_dynamic)
+            for arg in event_abi["inputs"]
+            if arg["indexed"]
+        ]
+        data_args = [arg for arg in event_abi["inputs"] if not arg["indexed"]]
+        self.data_names = [arg["name"] for arg in data_args]
+        self.data_types = [arg["type"] for arg in data_args]
+        self.address_names = [
+            arg["name"] for arg in event_abi["inputs"] if arg["type"] == "address"
+        ]
+
+    def decode(self, log: AttributeDict) -> AttributeDict:
+        args = {}
+        for (name, abi_type, is_dynamic), topic in zip(self.indexed, log["topics"][1:]):
+            # dynamic indexed values are only stored as their hash
+            args[name] = topic if is_dynamic else w3.codec.decode([abi_type], topic)[0]
+        args.update(
+            zip(
+                self.data_names, w3.codec.decode(self.data_types, HexBytes(log["data"]))
+            )
+        )
+        for name in self.address_names:
+            args[name] = w3.to_checksum_address(args[name])
+
+        return AttributeDict(
+            {
+                "args": AttributeDict(args),
+                "event": self.name,
+                "logIndex": log["logIndex"],
+                "transactionIndex": log["transactionIndex"],
+                "transactionHash": log["transactionHash"],
+                "address": log["address"],
+                "blockHash": log["blockHash"],
+                "blockNumber": log["blockNumber"],
+            }
+        )
+
+
+# decoders of the contract's events by topic
+EVENT_DECODERS = {
+    decoder.topic: decoder
+    for decoder in (
+        EventDecoder(event_abi)
+        for event_abi in abi
+        if event_abi["type"] == "event" and not event_abi.get("anonymous")
+    )
+}
+COMPENSATE_PROVIDER = next(
+    decoder
+    for decoder in EVENT_DECODERS.values()
+    if decoder.name == "CompensateProvider"
+)
+
+LATEST_BLOCK_CACHE_KEY = "latest_block_number"
+REQUIRED_CONFIRMATIONS = 2
+
+
+def receipt_cache_key(tx_hash: _Hash32) -> str:
+    return f"tx_verification_{str(tx_hash).lower()}"
+
+
+def get_latest_block_number() -> int:
+    """Latest block number, shared by every request for LATEST_BLOCK_TTL seconds"""
+    block_number = cache.get(LATEST_BLOCK_CACHE_KEY)
+    if block_number is None:
+        block_number = set_latest_block_number(
+            rpc_batcher.call(
+                "eth_blockNumber", [], current_app.config["RPC_BATCH_WINDOW"]
+            )
+        )
+    return block_number
+
+
+def set_latest_block_number(block_number: str) -> int:
+    block_number = int(block_number, 16)
+    cache.set(
+        LATEST_BLOCK_CACHE_KEY,
+        block_number,
+        timeout=current_app.config["LATEST_BLOCK_TTL"],
+    )
+    return block_number
+
+
+def format_log(log: dict) -> AttributeDict:
+    """A JSON-RPC log with the fields the event decoders read typed as web3 does"""
+    return AttributeDict(
+        {
+            "address": Web3.to_checksum_address(log["address"]),
+            "topics": [HexBytes(topic) for topic in log["topics"]],
+            "data": HexBytes(log["data"]),
+            "logIndex": int(log["logIndex"], 16),
+            "transactionIndex": int(log["transactionIndex"], 16),
+            "transactionHash": HexBytes(log["transactionHash"]),
+            "blockHash": HexBytes(log["blockHash"]),
+            "blockNumber": int(log["blockNumber"], 16),
+        }
+    )
+
+
+def format_receipt(receipt: dict) -> AttributeDict:
+    """A JSON-RPC receipt with the fields verification reads typed as web3 does"""
+    return AttributeDict(
+        {
+            "transactionHash": HexBytes(receipt["transactionHash"]),
+            "blockHash": HexBytes(receipt["blockHash"]),
+            "blockNumber": int(receipt["blockNumber"], 16),
+            "status": int(receipt["status"], 16),
+            "logs": [format_log(log) for log in receipt["logs"]],
+        }
+    )
+
+
+def fetch_transaction_receipt(tx_hash: _Hash32) -> tuple:
+    """
+    Fetch a receipt, and the latest block number if it isn't cached, in one batch.
+
+    :return: (receipt or None if not mined, latest block number)
+    """
+    calls = [("eth_getTransactionReceipt", [tx_hash])]
+    block_number = cache.get(LATEST_BLOCK_CACHE_KEY)
+    if block_number is None:
+        calls.append(("eth_blockNumber", []))
+    results = rpc_batcher.call_many(calls, current_app.config["RPC_BATCH_WINDOW"])
+    if block_number is None:
+        block_number = set_latest_block_number(results[1])
+    tx_receipt = results[0]
+    if tx_receipt is None:
+        return None, block_number
+    return format_receipt(tx_receipt), block_number
+
+
+def cache_verification(tx_hash: _Hash32, verification: dict, timeout: int):
+    cache.set(receipt_cache_key(tx_hash), verification, timeout=timeout)
+
+
+def raise_verification_error(verification: dict):
+    raise UtilError(
+        "Resource not found" if verification["code"] == 404 else "Forbidden",
+        verification["code"],
+        verification["message"],
+    )
+
+
+def is_transaction_confirmed(tx_hash: _Hash32) -> dict:
+    """
+    Compensation details of a successful transaction with enough confirmations.
+
+    Confirmed details are cached for good, receipts still waiting for
+    confirmations and failed lookups only for a few seconds, so users polling
+    a purchase don't cost a node round trip per request.
+    """
+    config = current_app.config
+    verification = cache.get(receipt_cache_key(tx_hash))
+    fetched = verification is None
+    if fetched:
+        tx_receipt, block_number = fetch_transaction_receipt(tx_hash)
+        if tx_receipt is None:
+            verification = {
+                "state": "failed",
+                "code": 404,
+                "message": f"Transaction with hash: '{tx_hash}' not found.",
+            }
+        elif not tx_receipt.status:
+            verification = {
+                "state": "failed",
+                "code": 403,
+                "message": "This was not a successful transaction",
+            }
+        else:
+            verification = {
+                "state": "mined",
+                "block_number": tx_receipt.blockNumber,
+                "details": dict(
+                    get_compensation_details(get_compensate_provider_event(tx_receipt))
+                ),
+            }
+    elif verification["state"] == "mined":
+        block_number = get_latest_block_number()
+    else:
+        block_number = None
+
+    if verification["state"] == "failed":
+        if fetched:
+            cache_verification(tx_hash, verification, config["RECEIPT_NEGATIVE_TTL"])
+        raise_verification_error(verification)
+
+    if verification["state"] == "mined":
+        if block_number - verification["block_number"] < REQUIRED_CONFIRMATIONS:
+            if fetched:
+                cache_verification(tx_hash, verification, config["RECEIPT_PENDING_TTL"])
+            raise UtilError("Forbidden", 403, "This was not a successful transaction")
+        verification = {"state": "confirmed", "details": verification["details"]}
+        cache_verification(tx_hash, verification, 0)
+
+    return verification["details"]
 
 
 def get_compensate_provider_event(tx_receipt: TxReceipt) -> AttributeDict:
-    log = ""
     for log in tx_receipt.logs:
         if (
-            log["topics"][0]
-            == w3.keccak(
-                text="CompensateProvider(address,address,uint256,uint256,string)"
-            ).hex()
+            log["topics"]
+            and log["topics"][0] == COMPENSATE_PROVIDER.topic
+            and log["address"] == contract.address
         ):
-            log = log
-    return contract.events.CompensateProvider().process_log(log)
+            return COMPENSATE_PROVIDER.decode(log)
+    raise UtilError("Forbidden", 403, "This transaction did not compensate a provider")
 
 
 def get_compensation_details(log: AttributeDict) -> AttributeDict:
@@ -54,10 +269,7 @@ def get_compensation_details(log: AttributeDict) -> AttributeDict:
 def verify_compensation_details(
     tx_hash: _Hash32, provider: _Hash32, user_id: str, signal_id: int
 ) -> AttributeDict:
-    tx_receipt = is_transaction_confirmed(tx_hash)
-    log = get_compensate_provider_event(tx_receipt)
-
-    data = get_compensation_details(log)
+    data = AttributeDict(is_transaction_confirmed(tx_hash))
 
     contract_check = w3.to_checksum_address(data.contract) == contract.address
     provider_check = w3.to_checksum_address(data.provider) == w3.to_checksum_address(
@@ -75,17 +287,19 @@ def verify_compensation_details(
 
 
 def get_pair_precision(pair: str, order_type: str):
-    precision = cache.get(f"{order_type}_prec_{pair}")
-    if precision is None:
+    precision = get_precision(pair, order_type)
+    if precision == MISSING:
+        try:
+            load_precision_on_demand()
+        except Exception as e:
+            current_app.log_exception(exc_info=e)
+        precision = get_precision(pair, order_type)
+    if precision == MISSING:
         raise UtilError(
             "Service Unavailable", 503, "Pair precision not found, its not you its us"
         )
-    strpd_precision = (
-        str(precision).rstrip("0").rstrip(".") if "." in precision else precision
-    )
-    precision = strpd_precision[::-1].find(".")
 
-    return None if precision == -1 else precision
+    return precision or None
 
 
 def prepare_spot_trade(signal: dict, trade_uuid: str, tp: float, quoteQty: float):
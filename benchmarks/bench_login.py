@@ -0,0 +1,73 @@
+"""
+Login throughput through the bounded bcrypt pool: concurrent clients posting
+to /auth/login with the right password, a wrong one and an unknown user.
+
+    python benchmarks/bench_login.py [logins] [client threads] [bcrypt rounds]
+
+Prints logins per second, the responses by status, 503s being logins the
+pool refused, and the median and p95 latency of each login.
+"""
+from common import configure, report
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from time import perf_counter
+import sys
+
+
+def main(logins, threads, rounds):
+    configure(
+        SESSION_TYPE="cookie",
+        SESSION_COOKIE_SECURE=False,
+        BCRYPT_LOG_ROUNDS=rounds,
+    )
+    from MySignalsApp import create_app, db, passwords
+    from MySignalsApp.models.users import User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        pw_hash = passwords.generate("correct horse")
+        for number in range(threads):
+            user = User(f"bench{number}", f"bench{number}@example.com", pw_hash)
+            user.is_active = True
+            db.session.add(user)
+        db.session.commit()
+
+    def login(number, password, known=True):
+        client = app.test_client()
+        user_name = f"bench{number % threads}" if known else f"nobody{number}"
+        start = perf_counter()
+        response = client.post(
+            "/auth/login", json={"user_name_or_mail": user_name, "password": password}
+        )
+        return response.status_code, perf_counter() - start
+
+    cases = {
+        "right password": dict(password="correct horse"),
+        "wrong password": dict(password="battery staple"),
+        "unknown user": dict(password="correct horse", known=False),
+    }
+    print(f"{logins} logins, {threads} clients, cost {rounds}")
+    for name, kwargs in cases.items():
+        with ThreadPoolExecutor(threads) as executor:
+            start = perf_counter()
+            results = list(
+                executor.map(lambda number: login(number, **kwargs), range(logins))
+            )
+            elapsed = perf_counter() - start
+        statuses = Counter(status for status, _ in results)
+        report(name, [timing for _, timing in results])
+        print(
+            f"{'':<40} {logins / elapsed:9.1f} logins/s   "
+            + ", ".join(
+                f"{status}: {count}" for status, count in sorted(statuses.items())
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 48,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 16,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 10,
+    )
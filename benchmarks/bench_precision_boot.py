@@ -0,0 +1,104 @@
+"""
+Time publishing and loading the shared pair precisions on the FileSystemCache
+used without Redis and on Redis: the single set_many write of set_precision,
+a cold worker reading the shared entry back, and a cold worker booting from
+the snapshot files into an empty cache.
+
+    python benchmarks/bench_precision_boot.py [repeat]
+"""
+from common import configure, measure, redis_url, report, skip
+import shutil
+import sys
+import os
+
+
+def boot_app(tmp_dir, cache_config):
+    from MySignalsApp import cache
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.update(
+        SPOT_EXCHANGE_INFO_SNAPSHOT=os.path.join(tmp_dir, "spot.json"),
+        FUTURES_EXCHANGE_INFO_SNAPSHOT=os.path.join(tmp_dir, "futures.json"),
+    )
+    cache.init_app(app, config=cache_config)
+    return app
+
+
+def bench_backend(name, app, repeat):
+    from MySignalsApp import exchange_info, cache
+
+    def cold_worker():
+        # a new worker starts without an index
+        exchange_info._precision_index = exchange_info.PrecisionIndex({}, {})
+
+    with app.app_context():
+        snapshot = exchange_info.usdt_min_qty(
+            exchange_info.read_snapshot(app.config["SPOT_EXCHANGE_INFO_SNAPSHOT"])
+        )
+        min_qty = (snapshot, snapshot)
+
+        def publish():
+            exchange_info.set_precision(min_qty)
+
+        def load_shared():
+            assert exchange_info.load_shared_precision()
+
+        def boot_from_files():
+            assert exchange_info.load_precision_snapshot(app)
+
+        def empty_cache():
+            cache.clear()
+            cold_worker()
+
+        try:
+            report(f"{name}, publish", measure(publish, repeat))
+            report(
+                f"{name}, load shared entry",
+                measure(load_shared, repeat, setup=cold_worker),
+            )
+            report(
+                f"{name}, boot from snapshot files",
+                measure(boot_from_files, repeat, setup=empty_cache),
+            )
+        finally:
+            cache.clear()
+
+
+def main(repeat):
+    configure()
+
+    tmp_dir = os.path.join("snapshots", "bench")
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name in ("spot.json", "futures.json"):
+        shutil.copy("sample_futures_exchange_info.json", os.path.join(tmp_dir, name))
+
+    try:
+        app = boot_app(
+            tmp_dir,
+            {
+                "CACHE_TYPE": "FileSystemCache",
+                "CACHE_DIR": os.path.join(tmp_dir, "cache"),
+            },
+        )
+        bench_backend("filesystem", app, repeat)
+
+        url = redis_url()
+        if url is None:
+            skip("redis", "no Redis server at REDIS")
+            return
+        app = boot_app(
+            tmp_dir,
+            {
+                "CACHE_TYPE": "RedisCache",
+                "CACHE_REDIS_URL": url,
+                "CACHE_KEY_PREFIX": "bench_precision_",
+            },
+        )
+        bench_backend("redis", app, repeat)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
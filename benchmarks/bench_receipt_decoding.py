@@ -0,0 +1,103 @@
+"""
+Time finding and decoding the CompensateProvider event of receipts with many
+logs, through the precomputed decoder registry against web3's generic
+process_log with the topic hashed per log as before.
+
+    python benchmarks/bench_receipt_decoding.py [repeat] [logs per receipt]
+"""
+from common import configure, measure, report
+import sys
+
+
+def raw_receipt(web3_helpers, logs):
+    """A receipt of logs - 1 transfers from other contracts, then a compensation"""
+    from web3 import Web3
+
+    codec = Web3().codec
+
+    def word(abi_type, value):
+        return "0x" + codec.encode([abi_type], [value]).hex()
+
+    def log(index, address, topics, data):
+        return {
+            "address": address,
+            "topics": topics,
+            "data": data,
+            "logIndex": hex(index),
+            "transactionIndex": "0x0",
+            "transactionHash": "0x" + "ab" * 32,
+            "blockHash": "0x" + "cd" * 32,
+            "blockNumber": "0x64",
+        }
+
+    transfer = Web3.keccak(text="Transfer(address,address,uint256)").hex()
+    entries = [
+        log(
+            index,
+            "0x" + f"{index + 1:040x}",
+            [
+                transfer,
+                word("address", "0x" + "11" * 20),
+                word("address", "0x" + "22" * 20),
+            ],
+            word("uint256", index),
+        )
+        for index in range(logs - 1)
+    ]
+    entries.append(
+        log(
+            logs - 1,
+            web3_helpers.contract.address,
+            [
+                "0x" + web3_helpers.COMPENSATE_PROVIDER.topic.hex(),
+                word("address", "0x" + "11" * 20),
+                word("address", "0x" + "22" * 20),
+                word("uint256", 7),
+            ],
+            "0x" + codec.encode(["uint256", "string"], [10**18, "user"]).hex(),
+        )
+    )
+    return {
+        "transactionHash": "0x" + "ab" * 32,
+        "blockHash": "0x" + "cd" * 32,
+        "blockNumber": "0x64",
+        "status": "0x1",
+        "logs": entries,
+    }
+
+
+def main(repeat, logs):
+    configure()
+    from MySignalsApp import web3_helpers
+    from web3.exceptions import MismatchedABI
+
+    receipt = web3_helpers.format_receipt(raw_receipt(web3_helpers, logs))
+    w3, contract = web3_helpers.w3, web3_helpers.contract
+
+    def registry():
+        event = web3_helpers.get_compensate_provider_event(receipt)
+        assert event.args.signalId == 7
+
+    def process_log():
+        event = None
+        for log in receipt.logs:
+            topic = w3.keccak(
+                text="CompensateProvider(address,address,uint256,uint256,string)"
+            )
+            if log["topics"] and log["topics"][0] == topic:
+                try:
+                    event = contract.events.CompensateProvider().process_log(log)
+                except MismatchedABI:
+                    continue
+        assert event.args.signalId == 7
+
+    print(f"receipts with {logs} logs")
+    report("decoder registry", measure(registry, repeat))
+    report("web3 process_log", measure(process_log, repeat))
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+    )
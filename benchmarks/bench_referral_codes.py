@@ -0,0 +1,98 @@
+"""
+Time referral code allocation from sequence blocks against the previous
+approach, drawing random codes until a SELECT on users finds them unused,
+alone and as part of registering a user.
+
+    python benchmarks/bench_referral_codes.py [registrations] [existing users]
+
+Set BENCH_DATABASE_URI to a Postgres database to allocate from the real
+sequence, sqlite falls back to random blocks.
+"""
+from common import configure, measure, report
+from contextlib import contextmanager
+from random import choices
+from uuid import uuid4
+import sys
+
+
+def main(registrations, existing):
+    configure()
+    from MySignalsApp import create_app, db
+    from MySignalsApp.models.users import User
+    from MySignalsApp.referral_codes import referral_codes, encode
+    from MySignalsApp.utils import query_one_filtered
+    from sqlalchemy import event
+
+    def probing_code():
+        # the allocation registration used before sequence blocks
+        code = "".join(choices(uuid4().hex, k=8))
+        while query_one_filtered(User, referral_code=code):
+            code = "".join(choices(uuid4().hex, k=8))
+        return code
+
+    @contextmanager
+    def count_users_selects():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT") and "users" in statement:
+                statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        # an established users table, so the probes search a real index
+        db.session.execute(
+            db.insert(User),
+            [
+                {
+                    "user_name": f"existing{number}",
+                    "email": f"existing{number}@example.com",
+                    "password": "unused",
+                    "referral_code": encode(2**31 + number),
+                }
+                for number in range(existing)
+            ],
+        )
+        db.session.commit()
+
+        print(f"{existing} existing users")
+        with count_users_selects() as selects:
+            report("probing, allocation", measure(probing_code, registrations))
+        print(f"{'':<40} {len(selects)} SELECTs on users")
+        with count_users_selects() as selects:
+            report(
+                "sequence block, allocation",
+                measure(referral_codes.next_code, registrations),
+            )
+        print(f"{'':<40} {len(selects)} SELECTs on users")
+
+        counter = iter(range(2 * registrations))
+
+        def register(allocate):
+            def register():
+                number = next(counter)
+                user = User(f"bench{number}", f"bench{number}@example.com", "unused")
+                user.referral_code = allocate()
+                user.insert()
+
+            return register
+
+        report("probing, registration", measure(register(probing_code), registrations))
+        report(
+            "sequence block, registration",
+            measure(register(referral_codes.next_code), registrations),
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20000,
+    )
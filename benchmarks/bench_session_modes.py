@@ -0,0 +1,62 @@
+"""
+Time an authenticated GET /auth/@me with each session backend: the signed
+cookie, Flask-Session's sqlalchemy table and Redis.
+
+    python benchmarks/bench_session_modes.py [repeat]
+
+The backend is fixed when the app is created, so each one is timed in its
+own process.
+"""
+from common import configure, measure, redis_url, report, skip
+import subprocess
+import sys
+
+
+MODES = ("cookie", "sqlalchemy", "redis")
+
+
+def run_mode(mode, repeat):
+    configure(SESSION_TYPE=mode, SESSION_COOKIE_SECURE=False)
+    from MySignalsApp import create_app, db
+    from MySignalsApp.models.users import User, Roles
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User("bench", "bench@example.com", "unused", Roles.USER)
+        user.is_active = True
+        user.insert()
+        session_user = {"id": user.id, "permission": user.roles.value}
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = session_user
+        session.permanent = True
+
+    def me():
+        with app.app_context():
+            response = client.get("/auth/@me")
+        assert response.status_code == 200, response.json
+
+    me()
+    report(f"{mode} session", measure(me, repeat))
+    if mode == "redis":
+        app.session_interface.redis.delete(
+            *app.session_interface.redis.keys(app.config["SESSION_KEY_PREFIX"] + "*")
+        )
+
+
+def main(repeat):
+    for mode in MODES:
+        if mode == "redis" and redis_url() is None:
+            skip("redis session", "no Redis server at REDIS")
+            continue
+        subprocess.run([sys.executable, __file__, str(repeat), mode], check=True)
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    if len(sys.argv) > 2:
+        run_mode(sys.argv[2], repeat)
+    else:
+        main(repeat)
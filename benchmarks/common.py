@@ -0,0 +1,85 @@
+"""
+Shared setup for the benchmarks, run them from the repository root:
+
+    python benchmarks/bench_precision_boot.py
+
+They use a throwaway sqlite database unless BENCH_DATABASE_URI is set, and
+the Redis server named by REDIS where a case compares against it, cases
+needing an unreachable Redis are skipped.
+"""
+from statistics import median, quantiles
+from time import perf_counter
+import tempfile
+import sys
+import os
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure(**config):
+    """
+    Point the app at a scratch database and apply config overrides, before
+    MySignalsApp is imported.
+
+    :return: the App_Config class
+    """
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    os.makedirs("logs", exist_ok=True)
+    if not os.environ.get("FERNET_KEY"):
+        from cryptography.fernet import Fernet
+
+        os.environ["FERNET_KEY"] = Fernet.generate_key().decode()
+    os.environ["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+        "BENCH_DATABASE_URI"
+    ) or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    from MySignalsApp.config import App_Config
+
+    App_Config.SQLALCHEMY_DATABASE_URI = os.environ["SQLALCHEMY_DATABASE_URI"]
+    App_Config.SECRET_KEY = App_Config.SECRET_KEY or "bench"
+    App_Config.RATELIMIT_ENABLED = False
+    App_Config.EXCHANGE_INFO_REFRESH_INTERVAL = 0
+    for name, value in config.items():
+        setattr(App_Config, name, value)
+    return App_Config
+
+
+def redis_url():
+    """:return: the REDIS url if a server answers there, else None"""
+    url = os.environ.get("REDIS")
+    if not url:
+        return None
+    import redis
+
+    try:
+        redis.from_url(url, socket_connect_timeout=1).ping()
+    except redis.RedisError:
+        return None
+    return url
+
+
+def measure(func, repeat, setup=None):
+    """:return: seconds each of repeat calls of func took, setup runs untimed before each"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    """Print the median and 95th percentile of timings, in milliseconds"""
+    p95 = quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+    print(
+        f"{name:<40} median {median(timings) * 1000:9.3f} ms"
+        f"   p95 {p95 * 1000:9.3f} ms   n={len(timings)}"
+    )
+
+
+def skip(name, reason):
+    print(f"{name:<40} skipped, {reason}")
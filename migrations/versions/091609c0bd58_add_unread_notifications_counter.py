@@ -0,0 +1,41 @@
+"""add unread notifications counter to users
+
+Revision ID: 091609c0bd58
+Revises: 8bba755bd9fe
+Create Date: 2026-10-18 15:22:47.906112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '091609c0bd58'
+down_revision = '8bba755bd9fe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_notifications', sa.Integer(), nullable=False, server_default='0'))
+
+    # count what is unread today, `flask reconcile-unread` can repair drift later
+    op.execute(
+        """
+        UPDATE users SET unread_notifications = (
+            SELECT COUNT(notifications.id) FROM notifications
+            WHERE notifications.user_id = users.id
+            AND notifications.date_created > COALESCE(
+                users.last_notification_read_time, '1900-01-01'
+            )
+        )
+        """
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('unread_notifications', server_default=None)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('unread_notifications')
@@ -0,0 +1,99 @@
+"""index listing queries and enforce unique user signal pair
+
+Revision ID: 1b84dc32eef2
+Revises: 576e70d998e4
+Create Date: 2026-10-18 10:03:17.551802
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b84dc32eef2'
+down_revision = '576e70d998e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('signals', schema=None) as batch_op:
+        batch_op.create_index('ix_signals_status_date_created', ['status', 'date_created', 'id'], unique=False)
+        batch_op.create_index('ix_signals_provider_date_created', ['provider', 'date_created', 'id'], unique=False)
+
+    # keep the first purchase of any duplicated pair before enforcing uniqueness
+    affected_providers = op.get_bind().execute(sa.text(
+        """
+        SELECT DISTINCT signals.provider
+        FROM placedsignals JOIN signals ON signals.id = placedsignals.signal_id
+        WHERE placedsignals.user_id IS NOT NULL
+        GROUP BY placedsignals.user_id, placedsignals.signal_id, signals.provider
+        HAVING COUNT(placedsignals.id) > 1
+        """
+    )).scalars().all()
+    op.execute(
+        """
+        DELETE FROM placedsignals
+        WHERE user_id IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM placedsignals
+            WHERE user_id IS NOT NULL
+            GROUP BY user_id, signal_id
+        )
+        """
+    )
+    # the deleted rows were counted in their providers' rating aggregates
+    if affected_providers:
+        op.get_bind().execute(sa.text(
+            """
+            UPDATE providerratings SET
+                rating_sum = (
+                    SELECT COALESCE(SUM(placedsignals.rating), 0)
+                    FROM placedsignals JOIN signals ON signals.id = placedsignals.signal_id
+                    WHERE signals.provider = providerratings.provider_id
+                ),
+                rated_count = (
+                    SELECT COUNT(placedsignals.id)
+                    FROM placedsignals JOIN signals ON signals.id = placedsignals.signal_id
+                    WHERE signals.provider = providerratings.provider_id
+                    AND placedsignals.rating > 0
+                ),
+                unrated_count = (
+                    SELECT COUNT(placedsignals.id)
+                    FROM placedsignals JOIN signals ON signals.id = placedsignals.signal_id
+                    WHERE signals.provider = providerratings.provider_id
+                    AND placedsignals.rating = 0
+                )
+            WHERE provider_id IN :provider_ids
+            """
+        ).bindparams(sa.bindparam('provider_ids', expanding=True)), {'provider_ids': affected_providers})
+    with op.batch_alter_table('placedsignals', schema=None) as batch_op:
+        batch_op.create_unique_constraint('_unique_user_signal_pair', ['user_id', 'signal_id'])
+        batch_op.create_index('ix_placedsignals_user_id_date_created', ['user_id', 'date_created', 'id'], unique=False)
+        batch_op.create_index('ix_placedsignals_signal_id', ['signal_id'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_id')
+        batch_op.create_index('ix_notifications_user_id_date_created', ['user_id', 'date_created', 'id'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_roles_date_created', ['roles', 'date_created'], unique=False)
+        batch_op.create_index('ix_users_date_created', ['date_created'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_date_created')
+        batch_op.drop_index('ix_users_roles_date_created')
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_id_date_created')
+        batch_op.create_index('ix_notifications_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('placedsignals', schema=None) as batch_op:
+        batch_op.drop_index('ix_placedsignals_signal_id')
+        batch_op.drop_index('ix_placedsignals_user_id_date_created')
+        batch_op.drop_constraint('_unique_user_signal_pair', type_='unique')
+
+    with op.batch_alter_table('signals', schema=None) as batch_op:
+        batch_op.drop_index('ix_signals_provider_date_created')
+        batch_op.drop_index('ix_signals_status_date_created')
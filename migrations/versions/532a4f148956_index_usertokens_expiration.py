@@ -0,0 +1,28 @@
+"""index usertokens expiration and user_id
+
+Revision ID: 532a4f148956
+Revises: dade304cff37
+Create Date: 2026-10-18 17:48:12.605390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '532a4f148956'
+down_revision = 'dade304cff37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('usertokens', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_usertokens_expiration'), ['expiration'], unique=False)
+        batch_op.create_index(batch_op.f('ix_usertokens_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('usertokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_usertokens_user_id'))
+        batch_op.drop_index(batch_op.f('ix_usertokens_expiration'))
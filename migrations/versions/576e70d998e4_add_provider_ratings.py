@@ -0,0 +1,50 @@
+"""add provider ratings aggregate
+
+Revision ID: 576e70d998e4
+Revises:
+Create Date: 2026-10-18 09:12:41.204316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '576e70d998e4'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('providerratings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('provider_id', sa.String(length=34), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('rated_count', sa.Integer(), nullable=False),
+    sa.Column('unrated_count', sa.Integer(), nullable=False),
+    sa.Column('date_created', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['provider_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id'),
+    sa.UniqueConstraint('provider_id')
+    )
+    # populate the aggregates from the existing ratings,
+    # `flask backfill-ratings` can repair them later in chunks
+    op.execute(
+        """
+        INSERT INTO providerratings
+            (provider_id, rating_sum, rated_count, unrated_count, date_created)
+        SELECT signals.provider,
+               COALESCE(SUM(placedsignals.rating), 0),
+               COUNT(placedsignals.id) FILTER (WHERE placedsignals.rating > 0),
+               COUNT(placedsignals.id) FILTER (WHERE placedsignals.rating = 0),
+               CURRENT_TIMESTAMP
+        FROM placedsignals JOIN signals ON signals.id = placedsignals.signal_id
+        GROUP BY signals.provider
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('providerratings')
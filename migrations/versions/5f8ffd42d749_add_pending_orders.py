@@ -0,0 +1,45 @@
+"""add pending protective orders
+
+Revision ID: 5f8ffd42d749
+Revises: 532a4f148956
+Create Date: 2026-10-18 19:12:40.218563
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '5f8ffd42d749'
+down_revision = '532a4f148956'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pendingorders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tracking_id', sa.String(length=40), nullable=False),
+    sa.Column('user_id', sa.String(length=34), nullable=False),
+    sa.Column('market', sa.String(length=8), nullable=False),
+    sa.Column('symbol', sa.String(length=20), nullable=False),
+    sa.Column('orders', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+    sa.Column('placed', sa.Integer(), nullable=False),
+    sa.Column('success_message', sa.String(length=210), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('attempted_at', sa.DateTime(), nullable=True),
+    sa.Column('date_created', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id'),
+    sa.UniqueConstraint('tracking_id')
+    )
+    with op.batch_alter_table('pendingorders', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pendingorders_attempted_at'), ['attempted_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pendingorders', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pendingorders_attempted_at'))
+
+    op.drop_table('pendingorders')
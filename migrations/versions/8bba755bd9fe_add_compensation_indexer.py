@@ -0,0 +1,55 @@
+"""add indexed compensations and indexer checkpoints
+
+Revision ID: 8bba755bd9fe
+Revises: 1b84dc32eef2
+Create Date: 2026-10-18 13:41:09.318245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8bba755bd9fe'
+down_revision = '1b84dc32eef2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('compensations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tx_hash', sa.String(length=66), nullable=False),
+    sa.Column('log_index', sa.Integer(), nullable=False),
+    sa.Column('block_number', sa.BigInteger(), nullable=False),
+    sa.Column('contract', sa.String(length=43), nullable=False),
+    sa.Column('provider', sa.String(length=43), nullable=False),
+    sa.Column('referrer', sa.String(length=43), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=78, scale=0), nullable=False),
+    sa.Column('signal_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.String(length=34), nullable=False),
+    sa.Column('date_created', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id'),
+    sa.UniqueConstraint('tx_hash', 'log_index', name='_unique_tx_log')
+    )
+    with op.batch_alter_table('compensations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_compensations_tx_hash'), ['tx_hash'], unique=False)
+
+    op.create_table('indexercheckpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('block_number', sa.BigInteger(), nullable=False),
+    sa.Column('date_created', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('indexercheckpoints')
+    with op.batch_alter_table('compensations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_compensations_tx_hash'))
+
+    op.drop_table('compensations')
@@ -0,0 +1,27 @@
+"""add referral code sequence
+
+Revision ID: dade304cff37
+Revises: 091609c0bd58
+Create Date: 2026-10-18 17:05:31.442871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dade304cff37'
+down_revision = '091609c0bd58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # databases without sequences allocate referral code blocks at random
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.CreateSequence(sa.Sequence('referral_code_seq', increment=1000)))
+
+
+def downgrade():
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.DropSequence(sa.Sequence('referral_code_seq')))
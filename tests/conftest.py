@@ -0,0 +1,109 @@
+"""
+Shared fixtures.
+
+The app runs against a throwaway sqlite database, or the database named by
+TEST_DATABASE_URI when set, e.g. a disposable Postgres database for the
+query plan checks. Redis, the node and Binance are never contacted.
+"""
+from contextlib import contextmanager
+from cryptography.fernet import Fernet
+from sqlalchemy import event
+import tempfile
+import pytest
+import os
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the app logs to logs/app.log and keeps its snapshots relative to the root
+os.chdir(ROOT)
+os.makedirs("logs", exist_ok=True)
+
+os.environ.setdefault("FERNET_KEY", Fernet.generate_key().decode())
+os.environ["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+    "TEST_DATABASE_URI"
+) or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ.pop("REDIS", None)
+
+from MySignalsApp.config import App_Config  # noqa: E402
+
+App_Config.SQLALCHEMY_DATABASE_URI = os.environ["SQLALCHEMY_DATABASE_URI"]
+App_Config.SECRET_KEY = "test"
+App_Config.CACHE_TYPE = "SimpleCache"
+App_Config.SESSION_TYPE = "cookie"
+App_Config.SESSION_COOKIE_SECURE = False
+App_Config.RATELIMIT_ENABLED = False
+App_Config.EXCHANGE_INFO_REFRESH_INTERVAL = 0
+App_Config.BCRYPT_LOG_ROUNDS = 4
+
+from MySignalsApp import create_app, db  # noqa: E402
+from MySignalsApp.models.users import User, Roles  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+    """Fresh tables for every test, inside an app context"""
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user():
+    def make_user(user_name, roles=Roles.USER, **kwargs):
+        user = User(user_name, f"{user_name}@example.com", "unused", roles, **kwargs)
+        user.is_active = True
+        user.insert()
+        return user
+
+    return make_user
+
+
+@pytest.fixture
+def login(client):
+    """Sign a user in on the test client, the way auth.login does"""
+
+    def login(user):
+        with client.session_transaction() as session:
+            session["user"] = {"id": user.id, "permission": user.roles.value}
+
+    return login
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Context manager collecting the statements sent to the database while open.
+
+        with count_queries() as statements:
+            client.get("/")
+        assert len(statements) == 3
+    """
+
+    @contextmanager
+    def count_queries():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    return count_queries
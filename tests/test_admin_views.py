@@ -0,0 +1,55 @@
+from MySignalsApp import db
+from MySignalsApp.models.users import User, Roles
+from MySignalsApp.models.notifications import Notification
+from datetime import datetime, timedelta
+import pytest
+
+
+FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@pytest.fixture
+def users(make_user, login):
+    registrar = make_user("registrar", Roles.REGISTRAR)
+    reader = make_user("reader")
+    reader.last_notification_read_time = datetime.utcnow()
+    reader.update()
+    ids = registrar.id, reader.id
+    login(registrar)
+    return ids
+
+
+def unread(user_id):
+    db.session.expire_all()
+    return db.session.get(User, user_id).unread_notifications
+
+
+def test_notification_edits_keep_unread_counters(client, users):
+    registrar_id, reader_id = users
+    later = (datetime.utcnow() + timedelta(minutes=1)).strftime(FORMAT)
+    earlier = (datetime.utcnow() - timedelta(days=1)).strftime(FORMAT)
+
+    response = client.post(
+        "/admin/notification/new/",
+        data={"user": reader_id, "message": "welcome", "date_created": later},
+    )
+    assert response.status_code == 302
+    assert unread(reader_id) == 1
+    (notification_id,) = db.session.execute(db.select(Notification.id)).scalars()
+
+    # older than the reader's last read, it no longer counts
+    client.post(
+        f"/admin/notification/edit/?id={notification_id}",
+        data={"user": reader_id, "message": "welcome", "date_created": earlier},
+    )
+    assert unread(reader_id) == 0
+
+    client.post(
+        f"/admin/notification/edit/?id={notification_id}",
+        data={"user": registrar_id, "message": "welcome", "date_created": earlier},
+    )
+    assert (unread(reader_id), unread(registrar_id)) == (0, 1)
+
+    client.post("/admin/notification/delete/", data={"id": notification_id})
+    assert db.session.get(Notification, notification_id) is None
+    assert unread(registrar_id) == 0
@@ -0,0 +1,54 @@
+from MySignalsApp import db, event_broker
+from MySignalsApp.models.notifications import Notification
+from MySignalsApp.models.users import Roles
+from flask import current_app, session
+import pytest
+
+
+@pytest.fixture
+def user_id(make_user, login):
+    user = make_user("listener")
+    user_id = user.id
+    login(user)
+    return user_id
+
+
+def test_notification_event_is_the_formatted_notification(user_id):
+    subscription = event_broker.subscribe([f"user:{user_id}"], "test")
+    try:
+        Notification.notify(user_id, "Your trade was placed")
+        db.session.commit()
+        message = subscription.get(timeout=1)
+    finally:
+        subscription.close()
+
+    event_name, data = message.strip().split("\n")
+    assert event_name == "event: notification"
+    notification = db.session.execute(db.select(Notification)).scalar_one()
+    assert data == "data: " + current_app.json.dumps(notification.format())
+    assert {"id", "date_created"} <= notification.format().keys()
+
+
+def test_streams_never_read_hold_no_slot(app, user_id):
+    # the test client reads the first chunk, a server may close before that
+    for _ in range(event_broker.max_connections + 1):
+        with app.test_request_context("/stream"):
+            session["user"] = {"id": user_id, "permission": Roles.USER.value}
+            response = app.full_dispatch_request()
+        assert response.status_code == 200
+        response.close()
+    assert event_broker.can_subscribe(user_id)
+
+
+def test_open_streams_are_limited(client, user_id):
+    streams = []
+    for _ in range(event_broker.max_connections):
+        response = client.get("/stream")
+        assert next(response.iter_encoded()).startswith(b"event: unread")
+        streams.append(response)
+    try:
+        assert client.get("/stream").status_code == 429
+    finally:
+        for response in streams:
+            response.close()
+    assert event_broker.can_subscribe(user_id)
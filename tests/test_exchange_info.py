@@ -0,0 +1,96 @@
+from MySignalsApp import cache, exchange_info
+from types import SimpleNamespace
+from flask import Flask
+from time import time
+import pytest
+
+
+INTERVAL = 600
+
+
+class StopRefresher(BaseException):
+    pass
+
+
+@pytest.fixture
+def refresher(monkeypatch, tmp_path):
+    """
+    An app with the refresher enabled, and the loops its requests started.
+
+    Threads are recorded instead of started, the test runs a loop itself.
+    """
+    started = []
+    monkeypatch.setattr(
+        exchange_info,
+        "Thread",
+        lambda target, **kwargs: SimpleNamespace(start=lambda: started.append(target)),
+    )
+    app = Flask(__name__)
+    app.config.update(
+        EXCHANGE_INFO_REFRESH_INTERVAL=INTERVAL,
+        SPOT_EXCHANGE_INFO_SNAPSHOT=str(tmp_path / "spot.json"),
+        FUTURES_EXCHANGE_INFO_SNAPSHOT=str(tmp_path / "futures.json"),
+    )
+    cache.init_app(app, config={"CACHE_TYPE": "SimpleCache"})
+    app.add_url_rule("/", "index", lambda: "")
+    exchange_info.start_precision_refresher(app)
+    return app, started
+
+
+def run_once(monkeypatch, refresh_forever):
+    """Run one iteration of a refresher loop, :return: (sleeps, refreshes)"""
+    sleeps, refreshes = [], []
+
+    def sleep(seconds):
+        if sleeps:
+            raise StopRefresher
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(exchange_info, "sleep", sleep)
+    monkeypatch.setattr(exchange_info, "refresh_precision", refreshes.append)
+    with pytest.raises(StopRefresher):
+        refresh_forever()
+    return sleeps, refreshes
+
+
+def test_refresher_starts_with_the_first_request_only(refresher):
+    app, started = refresher
+    assert not started
+    client = app.test_client()
+    client.get("/")
+    client.get("/")
+    assert len(started) == 1
+
+
+def test_refresher_sleeps_first_with_jitter(refresher, monkeypatch):
+    app, started = refresher
+    app.test_client().get("/")
+
+    sleeps, refreshes = run_once(monkeypatch, started[0])
+    assert len(refreshes) == 1
+    (slept,) = sleeps
+    jitter = INTERVAL * exchange_info.REFRESH_JITTER
+    assert INTERVAL - jitter <= slept <= INTERVAL + jitter
+
+
+def test_refresher_skips_precisions_refreshed_elsewhere(refresher, monkeypatch):
+    app, started = refresher
+    app.test_client().get("/")
+    with app.app_context():
+        cache.set(exchange_info.PRECISION_REFRESHED_AT_CACHE_KEY, time() - 60)
+
+    sleeps, refreshes = run_once(monkeypatch, started[0])
+    assert not refreshes
+
+    with app.app_context():
+        cache.set(exchange_info.PRECISION_REFRESHED_AT_CACHE_KEY, time() - INTERVAL)
+    sleeps, refreshes = run_once(monkeypatch, started[0])
+    assert refreshes == [app]
+
+
+def test_missing_snapshots_publish_nothing(refresher):
+    app, _ = refresher
+    with app.app_context():
+        cache.set(exchange_info.PRECISION_VERSION_CACHE_KEY, None)
+        assert not exchange_info.load_precision_snapshot(app)
+        assert cache.get(exchange_info.PRECISION_VERSION_CACHE_KEY) is None
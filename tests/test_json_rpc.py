@@ -0,0 +1,209 @@
+"""
+JsonRpcBatcher and receipt verification against a fake JSON-RPC node.
+"""
+from MySignalsApp import cache, web3_helpers
+from MySignalsApp.json_rpc import JsonRpcBatcher
+from MySignalsApp.errors.handlers import UtilError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import monotonic, sleep
+from web3 import Web3
+import json
+import pytest
+
+
+PROVIDER = "0x" + "11" * 20
+REFERRER = "0x" + "22" * 20
+TX_HASH = "0x" + "ab" * 32
+
+
+class FakeNode(ThreadingHTTPServer):
+    """
+    Answers JSON-RPC requests from results, a dict of method -> result or
+    callable(params). Every POSTed payload is kept in requests.
+    """
+
+    def __init__(self, results, delay=0):
+        super().__init__(("127.0.0.1", 0), FakeNodeHandler)
+        self.results = results
+        self.delay = delay
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def answer(self, request):
+        if request["method"] not in self.results:
+            return {
+                "jsonrpc": "2.0",
+                "id": request["id"],
+                "error": {"code": -32601, "message": "Method not found"},
+            }
+        result = self.results[request["method"]]
+        if callable(result):
+            result = result(request["params"])
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+
+class FakeNodeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(payload)
+        sleep(self.server.delay)
+        if isinstance(payload, list):
+            body = [self.server.answer(request) for request in payload]
+        else:
+            body = self.server.answer(payload)
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def node():
+    servers = []
+
+    def node(results, delay=0):
+        server = FakeNode(results, delay)
+        Thread(
+            target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        servers.append(server)
+        return server
+
+    yield node
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def batcher_for(server):
+    return JsonRpcBatcher(Web3.HTTPProvider(server.url))
+
+
+def test_idle_batcher_sends_without_waiting(node):
+    server = node({"eth_blockNumber": "0x10"})
+    start = monotonic()
+    assert batcher_for(server).call("eth_blockNumber", [], window=1) == "0x10"
+    assert monotonic() - start < 0.5
+    assert len(server.requests) == 1
+
+
+def test_calls_queued_behind_a_batch_in_flight_share_one(node):
+    server = node({"eth_chainId": "0x1", "echo": lambda params: params[0]}, 0.3)
+    batcher = batcher_for(server)
+    results = {}
+
+    def call(value):
+        results[value] = batcher.call("echo", [value], window=0.2)
+
+    first = Thread(target=batcher.call, args=("eth_chainId", []))
+    first.start()
+    sleep(0.1)
+    others = [Thread(target=call, args=(value,)) for value in range(3)]
+    for thread in others:
+        thread.start()
+    for thread in (first, *others):
+        thread.join()
+
+    assert results == {0: 0, 1: 1, 2: 2}
+    assert [len(r) if isinstance(r, list) else 1 for r in server.requests] == [1, 3]
+
+
+def test_errors_reach_only_their_caller(node):
+    server = node({"eth_blockNumber": "0x10"})
+    batcher = batcher_for(server)
+    with pytest.raises(ValueError, match="Method not found"):
+        batcher.call_many([("eth_blockNumber", []), ("eth_nope", [])])
+    assert batcher.call_many([("eth_blockNumber", []), ("eth_blockNumber", [])]) == [
+        "0x10",
+        "0x10",
+    ]
+
+
+def test_unreachable_node_fails_every_call():
+    batcher = JsonRpcBatcher(Web3.HTTPProvider("http://127.0.0.1:9"))
+    with pytest.raises(ValueError):
+        batcher.call_many([("eth_blockNumber", []), ("eth_chainId", [])])
+
+
+def encode(abi_types, values):
+    return "0x" + Web3().codec.encode(abi_types, values).hex()
+
+
+def compensation_receipt(user_id, signal_id, amount=10**18, status="0x1"):
+    return {
+        "transactionHash": TX_HASH,
+        "blockHash": "0x" + "cd" * 32,
+        "blockNumber": "0x64",
+        "status": status,
+        "logs": [
+            {
+                "address": web3_helpers.contract.address.lower(),
+                "topics": [
+                    "0x" + web3_helpers.COMPENSATE_PROVIDER.topic.hex(),
+                    encode(["address"], [PROVIDER]),
+                    encode(["address"], [REFERRER]),
+                    encode(["uint256"], [signal_id]),
+                ],
+                "data": encode(["uint256", "string"], [amount, user_id]),
+                "logIndex": "0x0",
+                "transactionIndex": "0x3",
+                "transactionHash": TX_HASH,
+                "blockHash": "0x" + "cd" * 32,
+                "blockNumber": "0x64",
+            }
+        ],
+    }
+
+
+@pytest.fixture
+def verifying_node(node, monkeypatch):
+    def verifying_node(receipt, latest_block):
+        cache.clear()
+        server = node(
+            {
+                "eth_getTransactionReceipt": receipt,
+                "eth_blockNumber": hex(latest_block),
+            }
+        )
+        monkeypatch.setattr(web3_helpers, "rpc_batcher", batcher_for(server))
+        return server
+
+    return verifying_node
+
+
+def test_receipt_and_block_number_come_in_one_batch(verifying_node):
+    server = verifying_node(compensation_receipt("user", 7), 0x70)
+
+    assert web3_helpers.verify_compensation_details(TX_HASH, PROVIDER, "user", 7)
+    (batch,) = server.requests
+    assert [request["method"] for request in batch] == [
+        "eth_getTransactionReceipt",
+        "eth_blockNumber",
+    ]
+
+
+def test_receipt_fields_are_typed(verifying_node):
+    verifying_node(compensation_receipt("user", 7), 0x70)
+
+    receipt, block_number = web3_helpers.fetch_transaction_receipt(TX_HASH)
+    assert block_number == 0x70
+    assert (receipt.status, receipt.blockNumber) == (1, 0x64)
+    event = web3_helpers.get_compensate_provider_event(receipt)
+    assert event.args.provider == Web3.to_checksum_address(PROVIDER)
+    assert (event.args.userId, event.args.signalId) == ("user", 7)
+    assert event.address == web3_helpers.contract.address
+
+
+def test_mismatched_compensation_is_refused(verifying_node):
+    verifying_node(compensation_receipt("someone else", 7), 0x70)
+    with pytest.raises(UtilError, match="do not match"):
+        web3_helpers.verify_compensation_details(TX_HASH, PROVIDER, "user", 7)
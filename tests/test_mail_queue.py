@@ -0,0 +1,138 @@
+"""
+MailQueue delivering to a local aiosmtpd sink.
+"""
+from MySignalsApp.mail_queue import MailQueue
+from aiosmtpd.controller import Controller
+from flask_mail import Mail, Message
+from flask import Flask
+from time import monotonic, sleep
+import socket
+import pytest
+
+
+class Sink:
+    """aiosmtpd handler keeping every message with the connection it came over"""
+
+    def __init__(self):
+        self.messages = []
+        self.failures = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.failures:
+            self.failures -= 1
+            return "451 Try again later"
+        self.messages.append((id(session), monotonic(), envelope.rcpt_tos))
+        return "250 OK"
+
+    def wait_for(self, count, timeout=10):
+        deadline = monotonic() + timeout
+        while len(self.messages) < count and monotonic() < deadline:
+            sleep(0.02)
+        return self.messages
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def sink():
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield sink, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def mail_queue(sink):
+    _, port = sink
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=port,
+        MAIL_USE_TLS=False,
+        MAIL_USE_SSL=False,
+        MAIL_DEFAULT_SENDER="noreply@example.com",
+        MAIL_QUEUE_WORKERS=1,
+        MAIL_QUEUE_SIZE=100,
+        MAIL_BATCH_SIZE=20,
+        MAIL_MAX_RETRIES=2,
+        MAIL_RETRY_DELAY=0.1,
+        MAIL_CONNECTION_IDLE_TIMEOUT=30,
+    )
+    return MailQueue(Mail(app), app)
+
+
+def send(mail_queue, number):
+    # messages take the default sender from the app, as in a request
+    with mail_queue.app.app_context():
+        mail_queue.send(
+            Message(f"mail {number}", recipients=[f"user{number}@example.com"])
+        )
+
+
+def wait_for_stats(mail_queue, name, count, timeout=10):
+    deadline = monotonic() + timeout
+    while mail_queue.stats()[name] < count and monotonic() < deadline:
+        sleep(0.02)
+    return mail_queue.stats()
+
+
+def test_burst_is_delivered_over_one_connection(sink, mail_queue):
+    sink, _ = sink
+    for number in range(10):
+        send(mail_queue, number)
+
+    messages = sink.wait_for(10)
+    assert sorted(rcpt for _, _, (rcpt,) in messages) == sorted(
+        f"user{number}@example.com" for number in range(10)
+    )
+    assert len({session for session, _, _ in messages}) == 1
+    stats = wait_for_stats(mail_queue, "sent", 10)
+    assert (stats["sent"], stats["retried"], stats["queue_depth"]) == (10, 0, 0)
+
+
+def test_failed_send_is_retried_with_backoff(sink, mail_queue):
+    sink, _ = sink
+    sink.failures = 2
+    start = monotonic()
+    send(mail_queue, 0)
+
+    ((_, delivered_at, _),) = sink.wait_for(1)
+    # waits retry_delay, then twice that, before the third attempt
+    assert delivered_at - start >= 0.1 + 0.2
+    stats = wait_for_stats(mail_queue, "sent", 1)
+    assert (stats["sent"], stats["retried"], stats["failed"]) == (1, 2, 0)
+
+
+def test_mail_is_dropped_after_max_retries(sink, mail_queue):
+    sink, _ = sink
+    sink.failures = 3
+    send(mail_queue, 0)
+
+    stats = wait_for_stats(mail_queue, "failed", 1)
+    assert (stats["sent"], stats["retried"], stats["failed"]) == (0, 2, 1)
+
+    send(mail_queue, 1)
+    ((_, _, rcpt),) = sink.wait_for(1)
+    assert rcpt == ["user1@example.com"]
+
+
+class BrokenMessage(Message):
+    def as_bytes(self):
+        raise ValueError("can't encode this message")
+
+
+def test_broken_message_does_not_stop_the_worker(sink, mail_queue):
+    sink, _ = sink
+    with mail_queue.app.app_context():
+        mail_queue.send(BrokenMessage("broken", recipients=["user0@example.com"]))
+    send(mail_queue, 1)
+
+    ((_, _, rcpt),) = sink.wait_for(1)
+    assert rcpt == ["user1@example.com"]
+    stats = wait_for_stats(mail_queue, "sent", 1)
+    assert (stats["sent"], stats["retried"], stats["failed"]) == (1, 0, 1)
@@ -0,0 +1,249 @@
+"""
+Protective orders against a local stand-in for the Binance REST endpoints
+the order pipeline uses.
+"""
+from MySignalsApp import db, binance_clients
+from MySignalsApp.credentials import encrypt_credential
+from MySignalsApp.models.notifications import Notification
+from MySignalsApp.models.pending_orders import PendingOrder
+from MySignalsApp.order_pipeline import (
+    get_tracking_status,
+    leg_client_order_id,
+    place_protective_orders,
+)
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from threading import Thread
+from datetime import datetime, timedelta
+import json
+import pytest
+
+
+class BinanceStandIn(ThreadingHTTPServer):
+    """
+    Keeps orders by client order id. Set fail_orders to answer every new
+    order with a 503, like an exchange in maintenance.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), BinanceHandler)
+        self.orders = {}
+        self.order_lists = {}
+        self.placed = []
+        self.fail_orders = False
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class BinanceHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def params(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        return url.path, dict(parse_qsl(url.query) + parse_qsl(body.decode()))
+
+    def do_GET(self):
+        path, params = self.params()
+        if path == "/api/v3/orderList":
+            found = self.server.order_lists.get(params["origClientOrderId"])
+            missing = {"code": -2011, "msg": "Order list does not exist."}
+        else:
+            found = self.server.orders.get(params["origClientOrderId"])
+            missing = {"code": -2013, "msg": "Order does not exist."}
+        self.reply(200, found) if found else self.reply(400, missing)
+
+    def do_POST(self):
+        path, params = self.params()
+        if self.server.fail_orders:
+            return self.reply(503, {"code": -1001, "msg": "Internal error"})
+        self.server.placed.append((path, params))
+        if path == "/api/v3/order/oco":
+            self.server.order_lists[params["listClientOrderId"]] = params
+        else:
+            self.server.orders[params["newClientOrderId"]] = {
+                **params,
+                "status": "NEW",
+            }
+        self.reply(200, params)
+
+
+@pytest.fixture
+def binance(monkeypatch):
+    server = BinanceStandIn()
+    Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    ).start()
+    monkeypatch.setattr(
+        binance_clients, "base_urls", {"spot": server.url, "futures": server.url}
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def trader(make_user):
+    user = make_user("trader")
+    user.api_key = encrypt_credential("key")
+    user.api_secret = encrypt_credential("secret")
+    user.update()
+    return user
+
+
+def notifications(user):
+    return (
+        db.session.execute(db.select(Notification.message).filter_by(user_id=user.id))
+        .scalars()
+        .all()
+    )
+
+
+def pending(tracking_id):
+    db.session.expire_all()
+    return db.session.execute(
+        db.select(PendingOrder).filter_by(tracking_id=tracking_id)
+    ).scalar_one_or_none()
+
+
+def crashed_trade(user, market, orders, id_param):
+    """A trade as left behind by a worker that died after its entry order"""
+    tracking_id = "a" * 32
+    trade = PendingOrder(
+        tracking_id,
+        user.id,
+        market,
+        "BTCUSDT",
+        [
+            [method, {**params, id_param: leg_client_order_id(tracking_id, index)}]
+            for index, (method, params) in enumerate(orders)
+        ],
+        "Stops placed",
+    )
+    trade.attempted_at = datetime.utcnow() - timedelta(hours=1)
+    trade.insert()
+    return tracking_id
+
+
+def recover(app, *args):
+    result = app.test_cli_runner().invoke(args=["recover-orders", *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_spot_stops_are_placed_after_the_entry(binance, trader):
+    tracking_id = "b" * 32
+    binance.orders[tracking_id] = {"status": "FILLED"}
+    stop_params = {
+        "symbol": "BTCUSDT",
+        "side": "SELL",
+        "quantity": 1,
+        "price": 2,
+        "stopPrice": 1,
+    }
+
+    place_protective_orders(
+        tracking_id,
+        trader.id,
+        "spot",
+        "BTCUSDT",
+        [("new_oco_order", stop_params)],
+        "Stops placed",
+    ).result()
+
+    ((path, params),) = binance.placed
+    assert path == "/api/v3/order/oco"
+    assert params["listClientOrderId"] == leg_client_order_id(tracking_id, 0)
+    assert pending(tracking_id) is None
+    assert get_tracking_status(tracking_id)["status"] == "placed"
+    assert notifications(trader) == ["Stops placed"]
+
+
+def test_rejected_entry_fails_the_trade(binance, trader):
+    tracking_id = "c" * 32
+    binance.orders[tracking_id] = {"status": "REJECTED"}
+
+    place_protective_orders(
+        tracking_id,
+        trader.id,
+        "futures",
+        "BTCUSDT",
+        [("new_order", {"symbol": "BTCUSDT", "side": "SELL", "type": "STOP_MARKET"})],
+        "placed",
+    ).result()
+
+    assert not binance.placed
+    assert pending(tracking_id) is None
+    assert get_tracking_status(tracking_id)["status"] == "failed"
+    assert notifications(trader) == [
+        f"Stop orders of trade {tracking_id} were not placed: Entry order was rejected"
+    ]
+
+
+def test_recovery_places_only_the_missing_orders(app, binance, trader):
+    tracking_id = crashed_trade(
+        trader,
+        "futures",
+        [
+            ("new_order", {"symbol": "BTCUSDT", "side": "SELL", "type": "STOP_MARKET"}),
+            (
+                "new_order",
+                {"symbol": "BTCUSDT", "side": "SELL", "type": "TAKE_PROFIT_MARKET"},
+            ),
+        ],
+        "newClientOrderId",
+    )
+    binance.orders[tracking_id] = {"status": "FILLED"}
+    # the stop reached Binance, the worker died before recording it
+    binance.orders[leg_client_order_id(tracking_id, 0)] = {"status": "NEW"}
+
+    assert "settled 1 pending trades" in recover(app, "--min-age", "60")
+
+    assert [params["type"] for _, params in binance.placed] == ["TAKE_PROFIT_MARKET"]
+    assert pending(tracking_id) is None
+    assert notifications(trader) == ["Stops placed"]
+
+
+def test_recovery_skips_recent_trades(app, binance, trader):
+    tracking_id = crashed_trade(trader, "futures", [("new_order", {})], "x")
+    assert "settled 0 pending trades" in recover(app, "--min-age", "7200")
+    assert pending(tracking_id).attempts == 0
+
+
+def test_unreachable_exchange_is_retried_then_given_up(app, binance, trader):
+    tracking_id = "d" * 32
+    binance.orders[tracking_id] = {"status": "FILLED"}
+    binance.fail_orders = True
+
+    place_protective_orders(
+        tracking_id,
+        trader.id,
+        "futures",
+        "BTCUSDT",
+        [("new_order", {"symbol": "BTCUSDT", "side": "SELL", "type": "STOP_MARKET"})],
+        "Stops placed",
+    ).result()
+    assert pending(tracking_id) is not None
+    assert get_tracking_status(tracking_id)["status"] == "pending"
+
+    assert "1 left to retry" in recover(app, "--min-age", "0", "--max-attempts", "2")
+    assert pending(tracking_id).attempts == 1
+    assert "gave up on 1" in recover(app, "--min-age", "0", "--max-attempts", "2")
+
+    assert pending(tracking_id) is None
+    assert get_tracking_status(tracking_id)["status"] == "failed"
+    assert notifications(trader) == [
+        f"Stop orders of trade {tracking_id} could not be placed, "
+        "please place them on Binance yourself"
+    ]
@@ -0,0 +1,13 @@
+from MySignalsApp import bcrypt, passwords
+
+
+def test_hashes_at_another_cost_are_rehashed(monkeypatch):
+    monkeypatch.setattr(passwords, "rounds", 5)
+    weaker, current, stronger = (
+        bcrypt.generate_password_hash("secret", rounds).decode("utf-8")
+        for rounds in (4, 5, 6)
+    )
+
+    assert passwords.cost(passwords.rehash(weaker, "secret")) == 5
+    assert passwords.rehash(current, "secret") is None
+    assert passwords.cost(passwords.rehash(stronger, "secret")) == 5
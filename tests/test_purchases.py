@@ -0,0 +1,52 @@
+from MySignalsApp import db
+from MySignalsApp.main import routes
+from MySignalsApp.models.users import Roles
+from MySignalsApp.models.signals import Signal
+from MySignalsApp.models.placed_signals import PlacedSignals
+import pytest
+
+
+TX_HASH = "0x" + "ab" * 32
+
+
+@pytest.fixture
+def purchase(make_user, login):
+    provider = make_user("provider", Roles.PROVIDER, wallet="0x" + "11" * 20)
+    user = make_user("buyer")
+    signal = Signal({"symbol": "BTCUSDT"}, True, provider.id, True, "text")
+    signal.insert()
+    ids = user.id, signal.id
+    login(user)
+    return ids
+
+
+def test_recorded_purchase_skips_verification(client, purchase, monkeypatch):
+    user_id, signal_id = purchase
+    PlacedSignals(user_id, signal_id, TX_HASH).insert()
+
+    def verify(*args):
+        raise AssertionError("verified a recorded purchase")
+
+    monkeypatch.setattr(routes, "verify_indexed_compensation", verify)
+    monkeypatch.setattr(routes, "verify_compensation_details", verify)
+
+    response = client.get(f"/signal/{signal_id}?tx_hash={TX_HASH}")
+    assert response.status_code == 200, response.json
+    assert response.json["signal"]["id"] == signal_id
+
+
+def test_unrecorded_purchase_is_verified(client, purchase, monkeypatch, app):
+    user_id, signal_id = purchase
+    monkeypatch.setattr(routes, "verify_indexed_compensation", lambda *args: False)
+    monkeypatch.setitem(app.config, "INDEXER_RPC_FALLBACK", False)
+
+    response = client.get(f"/signal/{signal_id}?tx_hash={TX_HASH}")
+    assert response.status_code == 404
+    assert "not been indexed" in response.json["message"]
+
+
+def test_indexer_needs_a_start_block(app, monkeypatch):
+    monkeypatch.setitem(app.config, "INDEXER_START_BLOCK", None)
+    result = app.test_cli_runner().invoke(args=["run-indexer", "--once"])
+    assert result.exit_code == 2
+    assert "INDEXER_START_BLOCK" in result.output
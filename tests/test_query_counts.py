@@ -0,0 +1,77 @@
+"""
+The listing feeds must issue the same number of statements however many
+rows the page holds, a count growing with the page is an N+1 regression.
+"""
+from MySignalsApp import db
+from MySignalsApp.models.users import Roles
+from MySignalsApp.models.signals import Signal
+from MySignalsApp.models.placed_signals import PlacedSignals
+from MySignalsApp.models.notifications import Notification
+import pytest
+
+
+PAGE_SIZES = (1, 6, 15)
+LISTING_MODES = ("", "?cursor=", "?with_total=true")
+
+
+def add_signals(make_user, count, provider=None):
+    """Active signals, each from its own provider unless provider is given"""
+    signals = []
+    for i in range(count):
+        owner = provider or make_user(f"provider{i}", Roles.PROVIDER)
+        signals.append(Signal({"symbol": "BTCUSDT"}, True, owner.id, True, "text"))
+    db.session.add_all(signals)
+    db.session.commit()
+    return signals
+
+
+def signals_feed(make_user, login, count):
+    add_signals(make_user, count)
+    login(make_user("reader"))
+    return "/"
+
+
+def provider_feed(make_user, login, count):
+    provider = make_user("provider", Roles.PROVIDER)
+    add_signals(make_user, count, provider)
+    login(provider)
+    return "/provider/signals"
+
+
+def trades_feed(make_user, login, count):
+    user = make_user("trader")
+    db.session.add_all(
+        PlacedSignals(user.id, signal.id, f"0x{i:064x}")
+        for i, signal in enumerate(add_signals(make_user, count))
+    )
+    db.session.commit()
+    login(user)
+    return "/mytrades"
+
+
+def notifications_feed(make_user, login, count):
+    user = make_user("reader")
+    Notification.notify_many((user.id, f"message {i}") for i in range(count))
+    db.session.commit()
+    login(user)
+    return "/auth/notifications"
+
+
+@pytest.mark.parametrize("mode", LISTING_MODES)
+@pytest.mark.parametrize(
+    "feed", [signals_feed, provider_feed, trades_feed, notifications_feed]
+)
+def test_feed_statement_count_is_constant(
+    app, client, make_user, login, count_queries, feed, mode
+):
+    counts = {}
+    for size in PAGE_SIZES:
+        db.drop_all()
+        db.create_all()
+        url = feed(make_user, login, size) + mode
+        # a context of its own, so g and the session start empty as in production
+        with app.app_context(), count_queries() as statements:
+            response = client.get(url)
+        assert response.status_code == 200, response.json
+        counts[size] = len(statements)
+    assert len(set(counts.values())) == 1, counts
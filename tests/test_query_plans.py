@@ -0,0 +1,87 @@
+"""
+The hot listing queries must be served from an index. Every SELECT the
+feeds send is explained, a plan scanning a whole table fails the test.
+
+Runs on sqlite by default, set TEST_DATABASE_URI to check Postgres plans.
+"""
+from MySignalsApp import db
+from MySignalsApp.models.users import Roles
+from MySignalsApp.models.signals import Signal
+from MySignalsApp.models.placed_signals import PlacedSignals
+from MySignalsApp.models.notifications import Notification
+from MySignalsApp.models.provider_ratings import ProviderRating
+from sqlalchemy import event
+import pytest
+import re
+
+
+HOT_URLS = [
+    "/",
+    "/?cursor=",
+    "/?with_total=true",
+    "/provider/signals",
+    "/provider/signals?cursor=",
+    "/mytrades",
+    "/mytrades?cursor=",
+    "/auth/notifications",
+    "/auth/notifications?cursor=",
+]
+# a full scan is "SCAN signals", walking an index is "SCAN signals USING INDEX ..."
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def explain(connection, statement, parameters):
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).all()
+        return [row[-1] for row in rows if SQLITE_FULL_SCAN.match(row[-1])]
+    if connection.dialect.name == "postgresql":
+        # tiny test tables are cheaper to scan, only a missing index should force it
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+        return [row[0] for row in rows if "Seq Scan" in row[0]]
+    pytest.skip(f"No plan check for {connection.dialect.name}")
+
+
+@pytest.fixture
+def hot_queries(app, client, make_user, login):
+    """(statement, parameters) of every SELECT sent while the feeds are listed"""
+    provider = make_user("provider", Roles.PROVIDER)
+    user = make_user("trader", Roles.PROVIDER)
+    signals = [
+        Signal({"symbol": "BTCUSDT"}, True, provider.id, True, "text") for _ in range(3)
+    ]
+    db.session.add_all(signals)
+    db.session.flush()
+    db.session.add_all(
+        PlacedSignals(user.id, signal.id, f"0x{signal.id:064x}") for signal in signals
+    )
+    ProviderRating.record_placed_signal(provider.id, 0, count=len(signals))
+    Notification.notify_many((user.id, f"message {i}") for i in range(3))
+    db.session.commit()
+    login(user)
+
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            queries.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        for url in HOT_URLS:
+            with app.app_context():
+                assert client.get(url).status_code == 200, url
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return queries
+
+
+def test_hot_queries_use_an_index(hot_queries):
+    assert hot_queries
+    with db.engine.connect() as connection:
+        for statement, parameters in hot_queries:
+            with connection.begin():
+                scans = explain(connection, statement, parameters)
+            assert not scans, f"{scans} in plan of\n{statement}"
@@ -0,0 +1,151 @@
+"""
+TelegramDispatcher against a local stand-in for the Telegram Bot API.
+"""
+from MySignalsApp.telegram_dispatcher import TelegramDispatcher
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+from threading import Thread
+from time import monotonic, sleep
+import logging
+import json
+import pytest
+
+
+CHAT_ID = "-1001"
+
+
+class BotApiStandIn(ThreadingHTTPServer):
+    """
+    Keeps the (time, text) of every message sent. The first rate_limited
+    sendMessage calls are answered with a 429 asking to retry after a second.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), BotApiHandler)
+        self.messages = []
+        self.rate_limited = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}/bot"
+
+    def wait_for(self, count, timeout=10):
+        deadline = monotonic() + timeout
+        while len(self.messages) < count and monotonic() < deadline:
+            sleep(0.02)
+        return self.messages
+
+
+class BotApiHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            params = json.loads(body or b"{}")
+        else:
+            params = dict(parse_qsl(body.decode()))
+        method = self.path.rsplit("/", 1)[-1]
+        if method == "getMe":
+            return self.reply(
+                200,
+                {
+                    "ok": True,
+                    "result": {
+                        "id": 1,
+                        "is_bot": True,
+                        "first_name": "signals",
+                        "username": "signals_bot",
+                    },
+                },
+            )
+        if method != "sendMessage":
+            return self.reply(404, {"ok": False, "error_code": 404})
+        if self.server.rate_limited:
+            self.server.rate_limited -= 1
+            return self.reply(
+                429,
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry after 1",
+                    "parameters": {"retry_after": 1},
+                },
+            )
+        self.server.messages.append((monotonic(), params["text"]))
+        self.reply(
+            200,
+            {
+                "ok": True,
+                "result": {
+                    "message_id": len(self.server.messages),
+                    "date": 0,
+                    "chat": {"id": int(CHAT_ID), "type": "channel"},
+                    "text": params["text"],
+                },
+            },
+        )
+
+
+@pytest.fixture
+def bot_api():
+    server = BotApiStandIn()
+    Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    ).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dispatcher(bot_api):
+    dispatcher = TelegramDispatcher()
+    dispatcher.token = "123:token"
+    dispatcher.chat_id = CHAT_ID
+    dispatcher.base_url = bot_api.base_url
+    dispatcher.coalesce_window = 0.2
+    dispatcher.min_interval = 0.5
+    dispatcher.logger = logging.getLogger("telegram-test")
+    return dispatcher
+
+
+def test_burst_is_coalesced_into_one_message(bot_api, dispatcher):
+    for number in range(5):
+        dispatcher.send(f"signal {number}")
+
+    ((_, text),) = bot_api.wait_for(1)
+    sleep(dispatcher.coalesce_window + dispatcher.min_interval)
+    assert len(bot_api.messages) == 1
+    assert text == "\n\n".join(f"signal {number}" for number in range(5))
+
+
+def test_messages_too_long_to_join_are_spaced(bot_api, dispatcher):
+    for letter in "abc":
+        dispatcher.send(letter * 3000)
+
+    messages = bot_api.wait_for(3)
+    assert [text[0] for _, text in messages] == ["a", "b", "c"]
+    gaps = [later - earlier for (earlier, _), (later, _) in zip(messages, messages[1:])]
+    assert min(gaps) >= dispatcher.min_interval
+
+
+# the dispatcher reads retry_after as seconds or as the coming timedelta
+@pytest.mark.filterwarnings("ignore::telegram.warnings.PTBDeprecationWarning")
+def test_rate_limited_message_is_sent_after_retry_after(bot_api, dispatcher):
+    bot_api.rate_limited = 1
+    start = monotonic()
+    dispatcher.send("signal")
+
+    ((sent_at, text),) = bot_api.wait_for(1)
+    assert text == "signal"
+    assert sent_at - start >= 1 + dispatcher.coalesce_window
@@ -0,0 +1,44 @@
+from MySignalsApp import db
+from MySignalsApp.models import users
+from MySignalsApp.models.users import User
+from MySignalsApp.models.notifications import Notification
+from sqlalchemy.exc import IntegrityError
+import pytest
+
+
+@pytest.fixture
+def next_codes(monkeypatch):
+    """Records the codes drawn through User.set_referral_code"""
+    drawn = []
+    next_code = users.referral_codes.next_code
+
+    def record():
+        drawn.append(next_code())
+        return drawn[-1]
+
+    monkeypatch.setattr(users.referral_codes, "next_code", record)
+    return drawn
+
+
+def test_taken_referral_code_is_redrawn_in_a_savepoint(make_user, next_codes):
+    first = make_user("first")
+    taken = first.referral_code
+    pending = Notification(first.id, "kept across the retry")
+    db.session.add(pending)
+
+    user = User("second", "second@example.com", "unused")
+    user.referral_code = taken
+    user.insert()
+
+    assert user.referral_code not in (taken, None)
+    assert db.session.get(User, user.id).referral_code == next_codes[-1]
+    assert db.session.get(Notification, pending.id).message == "kept across the retry"
+
+
+def test_other_violations_are_not_retried(make_user, next_codes):
+    make_user("first")
+    drawn = len(next_codes)
+
+    with pytest.raises(IntegrityError):
+        User("first", "other@example.com", "unused").insert()
+    assert len(next_codes) == drawn + 1  # the constructor's code only